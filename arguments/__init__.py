@@ -47,6 +47,19 @@ class ModelParams(ParamGroup):
         self._white_background = False
         self.train_test_exp = False
         self.data_device = "cuda"
+        self.disable_colmap_cache = False
+        # Decode images on first use, keeping them in LRU caches of the given sizes
+        self.lazy_images = False
+        self.image_cache_host_mb = 8192
+        self.image_cache_device_mb = 2048
+        self.camera_load_workers = 0  # 0: min(8, cpu count), 1: sequential
+        self.preprocessed_cache_dir = ""  # Resized images / depth maps as .npy, empty disables
+        self.compact_images = False  # Keep ground truth as uint8, converted to float on use
+        # The shared pages are only used in place with data_device cpu; with cuda every job still copies its
+        # images to the GPU. Entries are mapped copy-on-write, so a job that writes to an image gets a private page
+        self.shared_image_store = ""  # e.g. /dev/shm/gs_images: decoded images shared by concurrent jobs
+        self.half_precision_depth = False  # Store depth priors as fp16
+        self.prefetch_cameras = 0  # Training views staged ahead through pinned memory, 0 disables
 
 
         # New arguments for DBSCAN and regularization
@@ -69,6 +82,18 @@ class DenoiseParams(ParamGroup):  # New argument group for denoising
         super().__init__(parser, "Denoising Parameters")
 
 
+class CheckpointParams(ParamGroup):
+    def __init__(self, parser):
+        self.checkpoint_format = "pth"  # "pth" (torch.save) or "native" (utils/checkpoint_utils.py)
+        # The options below apply to the native format
+        self.checkpoint_async = False
+        self.checkpoint_max_in_flight = 2
+        self.checkpoint_full_every = 1  # > 1: delta checkpoints in between full ones
+        self.checkpoint_keep_last = 0  # 0 keeps everything
+        self.checkpoint_keep_every = 0
+        super().__init__(parser, "Checkpoint Parameters")
+
+
 class PipelineParams(ParamGroup):
     def __init__(self, parser):
         self.convert_SHs_python = False
@@ -100,6 +125,38 @@ class OptimizationParams(ParamGroup):
         self.apply_regularization = False
         self.regularization_weight = 0.1  # Default value
 
+        # Sparse updates driven by the per-camera visibility cache
+        self.sparse_visibility_updates = False
+        self.visibility_refresh_interval = 1000
+
+        # Morton-order compaction of the Gaussians (interval 0 disables the schedule)
+        self.morton_reorder_interval = 0
+        self.morton_reorder_on_save = False
+
+        # Training view selection: "uniform" (every view once per epoch) or "loss" (proportional to the
+        # running photometric loss, with camera_sampling_floor of the probability spread uniformly)
+        self.camera_sampling = "uniform"
+        self.camera_sampling_floor = 0.2
+        self.camera_sampling_decay = 0.9
+        self.camera_sampling_refresh = 100
+        self.camera_sampling_seed = -1
+
+        # Views rendered per optimizer step, the iteration-based schedules are divided by it. The DBSCAN
+        # regularization is added once per step, i.e. once per batch_size rendered views
+        self.batch_size = 1
+        # Report the wall-clock time at which the test PSNR first reaches this value (0 disables)
+        self.target_psnr = 0.0
+
+        # Convergence monitor on convergence_views training views held out of training, never the test views
+        # (interval 0 disables it): a plateau, no gain of convergence_min_gain dB per 1000 views over
+        # convergence_patience evaluations, first ends densification, then shortens the run to
+        # convergence_anneal_iters more iterations with compressed learning rate decay
+        self.convergence_interval = 0
+        self.convergence_views = 8
+        self.convergence_min_gain = 0.05
+        self.convergence_patience = 3
+        self.convergence_anneal_iters = 3000
+        self.convergence_densify_only = False
 
         super().__init__(parser, "Optimization Parameters")
 
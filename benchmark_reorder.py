@@ -0,0 +1,75 @@
+#
+# Times neighbour queries and rendering of a trained model before and after
+# GaussianModel.reorder_morton().
+#
+# python benchmark_reorder.py -m <model path> [--iteration N] [--repeats R]
+#
+
+import torch
+import time
+from scene import Scene
+from gaussian_renderer import render
+from utils.general_utils import safe_state
+from argparse import ArgumentParser
+from arguments import ModelParams, PipelineParams, get_combined_args
+from gaussian_renderer import GaussianModel
+from simple_knn._C import distCUDA2
+from sklearn.neighbors import NearestNeighbors
+import diff_gaussian_rasterization
+SPARSE_ADAM_AVAILABLE = hasattr(diff_gaussian_rasterization, "SparseGaussianAdam")
+
+def timed(fn, repeats):
+    fn()
+    torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    torch.cuda.synchronize()
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+def measure(gaussians, views, pipeline, background, repeats):
+    def render_all():
+        for view in views:
+            render(view, gaussians, pipeline, background, separate_sh=SPARSE_ADAM_AVAILABLE)
+
+    def knn_cpu():
+        points = gaussians.get_xyz.detach().cpu().numpy()
+        NearestNeighbors(n_neighbors=2).fit(points).kneighbors(points)
+
+    return {
+        "distCUDA2 [ms]": timed(lambda: distCUDA2(gaussians.get_xyz), repeats),
+        "sklearn kNN [ms]": timed(knn_cpu, 1),
+        "render / view [ms]": timed(render_all, repeats) / max(len(views), 1)
+    }
+
+def benchmark(dataset : ModelParams, iteration : int, pipeline : PipelineParams, repeats : int):
+    with torch.no_grad():
+        gaussians = GaussianModel(dataset.sh_degree)
+        scene = Scene(dataset, gaussians, load_iteration=iteration, shuffle=False)
+
+        bg_color = [1,1,1] if dataset.white_background else [0, 0, 0]
+        background = torch.tensor(bg_color, dtype=torch.float32, device="cuda")
+        views = scene.getTrainCameras()
+
+        print("Gaussians: {}, views: {}".format(gaussians.get_xyz.shape[0], len(views)))
+        before = measure(gaussians, views, pipeline, background, repeats)
+        gaussians.reorder_morton()
+        after = measure(gaussians, views, pipeline, background, repeats)
+
+        print("{:<22}{:>12}{:>12}".format("", "storage", "morton"))
+        for key in before:
+            print("{:<22}{:>12.2f}{:>12.2f}".format(key, before[key], after[key]))
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Morton reordering benchmark")
+    model = ModelParams(parser, sentinel=True)
+    pipeline = PipelineParams(parser)
+    parser.add_argument("--iteration", default=-1, type=int)
+    parser.add_argument("--repeats", default=5, type=int)
+    parser.add_argument("--quiet", action="store_true")
+    args = get_combined_args(parser)
+    print("Benchmarking " + args.model_path)
+
+    safe_state(args.quiet)
+
+    benchmark(model.extract(args), args.iteration, pipeline.extract(args), args.repeats)
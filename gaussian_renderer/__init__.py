@@ -15,11 +15,16 @@ from diff_gaussian_rasterization import GaussianRasterizationSettings, GaussianR
 from scene.gaussian_model import GaussianModel
 from utils.sh_utils import eval_sh
 
-def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor, scaling_modifier = 1.0, separate_sh = False, override_color = None, use_trained_exp=False):
+def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor, scaling_modifier = 1.0, separate_sh = False, override_color = None, use_trained_exp=False, visible_indices=None, return_visibility_filter=True):
     """
     Render the scene. 
     
     Background tensor (bg_color) must be on GPU!
+    If visible_indices is given, only those Gaussians are handed to the rasterizer
+    (pre-culling from the visibility cache); radii and viewspace gradients are
+    still returned at full size.
+    With return_visibility_filter False the visibility filter, whose nonzero()
+    waits for the GPU, is not computed and returned as None.
     """
  
     # Create zero tensor. We will use it to make pytorch return gradients of the 2D (screen-space) means
@@ -86,6 +91,19 @@ def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor,
     else:
         colors_precomp = override_color
 
+    # Pre-cull to the cached visible subset. Gathering from screenspace_points keeps
+    # its gradient full-size, so densification statistics need no remapping.
+    if visible_indices is not None:
+        idx = visible_indices.long()
+        means3D, means2D, opacity = means3D[idx], means2D[idx], opacity[idx]
+        scales = scales[idx] if scales is not None else None
+        rotations = rotations[idx] if rotations is not None else None
+        cov3D_precomp = cov3D_precomp[idx] if cov3D_precomp is not None else None
+        shs = shs[idx] if shs is not None else None
+        colors_precomp = colors_precomp[idx] if colors_precomp is not None else None
+        if separate_sh and override_color is None and not pipe.convert_SHs_python:
+            dc = dc[idx]
+
     # Rasterize visible Gaussians to image, obtain their radii (on screen). 
     if separate_sh:
         rendered_image, radii, depth_image = rasterizer(
@@ -108,6 +126,11 @@ def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor,
             scales = scales,
             rotations = rotations,
             cov3D_precomp = cov3D_precomp)
+
+    if visible_indices is not None:
+        full_radii = torch.zeros(pc.get_xyz.shape[0], dtype=radii.dtype, device=radii.device)
+        full_radii[idx] = radii
+        radii = full_radii
         
     # Apply exposure to rendered image (training only)
     if use_trained_exp:
@@ -120,7 +143,7 @@ def render(viewpoint_camera, pc : GaussianModel, pipe, bg_color : torch.Tensor,
     out = {
         "render": rendered_image,
         "viewspace_points": screenspace_points,
-        "visibility_filter" : (radii > 0).nonzero(),
+        "visibility_filter" : (radii > 0).nonzero() if return_visibility_filter else None,
         "radii": radii,
         "depth" : depth_image
         }
@@ -10,13 +10,15 @@
 #
 
 import os
+import time
 import random
 import json
 from utils.system_utils import searchForMaxIteration
 from scene.dataset_readers import sceneLoadTypeCallbacks
 from scene.gaussian_model import GaussianModel
 from arguments import ModelParams
-from utils.camera_utils import cameraList_from_camInfos, camera_to_JSON
+from utils.camera_utils import cameraPyramid_from_camInfos, camera_to_JSON
+from scene.image_cache import ImageCache
 
 class Scene:
 
@@ -40,14 +42,20 @@ class Scene:
         self.train_cameras = {}
         self.test_cameras = {}
 
+        # Wall time of the loading phases, reported by train.py --profile_startup
+        self.load_timings = {}
+        phase_start = time.perf_counter()
         if os.path.exists(os.path.join(args.source_path, "sparse")):
-            scene_info = sceneLoadTypeCallbacks["Colmap"](args.source_path, args.images, args.depths, args.eval, args.train_test_exp)
+            scene_info = sceneLoadTypeCallbacks["Colmap"](args.source_path, args.images, args.depths, args.eval, args.train_test_exp,
+                                                          use_cache=not getattr(args, "disable_colmap_cache", False))
         elif os.path.exists(os.path.join(args.source_path, "transforms_train.json")):
             print("Found transforms_train.json file, assuming Blender data set!")
             scene_info = sceneLoadTypeCallbacks["Blender"](args.source_path, args.white_background, args.depths, args.eval)
         else:
             assert False, "Could not recognize scene type!"
 
+        self.load_timings["scene parsing"] = time.perf_counter() - phase_start
+
         if not self.loaded_iter:
             with open(scene_info.ply_path, 'rb') as src_file, open(os.path.join(self.model_path, "input.ply") , 'wb') as dest_file:
                 dest_file.write(src_file.read())
@@ -68,12 +76,22 @@ class Scene:
 
         self.cameras_extent = scene_info.nerf_normalization["radius"]
 
-        for resolution_scale in resolution_scales:
-            print("Loading Training Cameras")
-            self.train_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.train_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, False)
-            print("Loading Test Cameras")
-            self.test_cameras[resolution_scale] = cameraList_from_camInfos(scene_info.test_cameras, resolution_scale, args, scene_info.is_nerf_synthetic, True)
-
+        self.image_cache = None
+        if getattr(args, "lazy_images", False):
+            self.image_cache = ImageCache(args.image_cache_host_mb * 2**20, args.image_cache_device_mb * 2**20, args.data_device)
+            print("Lazy image loading, cache budgets: {} MB host, {} MB device".format(args.image_cache_host_mb, args.image_cache_device_mb))
+
+        phase_start = time.perf_counter()
+        print("Loading Training Cameras")
+        self.train_cameras = cameraPyramid_from_camInfos(scene_info.train_cameras, resolution_scales, args, scene_info.is_nerf_synthetic, False, self.image_cache)
+        print("Loading Test Cameras")
+        self.test_cameras = cameraPyramid_from_camInfos(scene_info.test_cameras, resolution_scales, args, scene_info.is_nerf_synthetic, True, self.image_cache)
+        if self.image_cache is None:
+            image_bytes = sum(cam.image_memory_bytes() for cams in list(self.train_cameras.values()) + list(self.test_cameras.values()) for cam in cams)
+            print("Ground truth images: {:.1f} MB on {}".format(image_bytes / 2**20, args.data_device))
+        self.load_timings["image loading"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
         if self.loaded_iter:
             self.gaussians.load_ply(os.path.join(self.model_path,
                                                            "point_cloud",
@@ -81,10 +99,11 @@ class Scene:
                                                            "point_cloud.ply"), args.train_test_exp)
         else:
             self.gaussians.create_from_pcd(scene_info.point_cloud, scene_info.train_cameras, self.cameras_extent)
+        self.load_timings["model init"] = time.perf_counter() - phase_start
 
-    def save(self, iteration):
+    def save(self, iteration, async_write=False, morton_order=False):
         point_cloud_path = os.path.join(self.model_path, "point_cloud/iteration_{}".format(iteration))
-        self.gaussians.save_ply(os.path.join(point_cloud_path, "point_cloud.ply"))
+        self.gaussians.save_ply(os.path.join(point_cloud_path, "point_cloud.ply"), async_write, morton_order)
         exposure_dict = {
             image_name: self.gaussians.get_exposure_from_name(image_name).detach().cpu().numpy().tolist()
             for image_name in self.gaussians.exposure_mapping
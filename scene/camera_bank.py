@@ -0,0 +1,51 @@
+import torch
+import numpy as np
+from utils.graphics_utils import getWorld2View2Batch, getProjectionMatrixBatch
+
+class CameraBank:
+    """
+    Stacked pose and projection data of a list of cameras.
+
+    R, T, trans, scale and the fields of view are kept as (N, ...) arrays; the
+    world-view, projection and full projection matrices (N, 4, 4) and the camera
+    centers (N, 3) are computed once with batched math on the GPU. Each Camera is
+    attached to a bank and reads its matrices as views of row `bank_index`, so a
+    scene load makes a handful of allocations instead of several per camera.
+    """
+
+    def __init__(self, cameras, device="cuda"):
+        self.cameras = list(cameras)
+        self.R = np.stack([cam.R for cam in self.cameras]) if self.cameras else np.zeros((0, 3, 3))
+        self.T = np.stack([cam.T for cam in self.cameras]) if self.cameras else np.zeros((0, 3))
+        self.trans = np.stack([cam.trans for cam in self.cameras]) if self.cameras else np.zeros((0, 3))
+        self.scale = np.array([cam.scale for cam in self.cameras], dtype=np.float64)
+        self.FoVx = torch.tensor([cam.FoVx for cam in self.cameras], dtype=torch.float32, device=device)
+        self.FoVy = torch.tensor([cam.FoVy for cam in self.cameras], dtype=torch.float32, device=device)
+        self.image_width = torch.tensor([cam.image_width for cam in self.cameras], device=device)
+        self.image_height = torch.tensor([cam.image_height for cam in self.cameras], device=device)
+        # All cameras share the clipping planes set in Camera
+        self.znear = self.cameras[0].znear if self.cameras else 0.01
+        self.zfar = self.cameras[0].zfar if self.cameras else 100.0
+
+        world_view = getWorld2View2Batch(self.R, self.T, self.trans, self.scale)
+        self.world_view_transform = torch.from_numpy(world_view).to(device).transpose(1, 2)
+        self.projection_matrix = getProjectionMatrixBatch(self.znear, self.zfar, self.FoVx, self.FoVy).transpose(1, 2)
+        self.full_proj_transform = self.world_view_transform.bmm(self.projection_matrix)
+        self.camera_center = torch.linalg.inv(self.world_view_transform)[:, 3, :3]
+
+        for index, cam in enumerate(self.cameras):
+            cam.attach_bank(self, index)
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def in_frustum(self, points, margin=1.3):
+        """
+        (N, P) mask of the points (P, 3) inside each camera's frustum, widened by
+        margin in normalized device coordinates and cut at znear.
+        """
+        points_h = torch.cat([points, torch.ones_like(points[:, :1])], dim=1)
+        view = torch.einsum("pk,nkj->npj", points_h, self.world_view_transform)
+        clip = torch.einsum("pk,nkj->npj", points_h, self.full_proj_transform)
+        ndc = clip[..., :2] / (clip[..., 3:4] + 1e-7)
+        return (view[..., 2] > self.znear) & (ndc.abs() <= margin).all(dim=-1)
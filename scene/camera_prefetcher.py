@@ -0,0 +1,86 @@
+import torch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from scene.cameras import image_to_float
+from scene.camera_sampler import UniformCameraSampler
+
+class TrainingView:
+    """ A training camera with its ground truth tensors on the GPU (invdepthmap may be fp16). """
+
+    def __init__(self, camera, original_image, alpha_mask, invdepthmap):
+        self.camera = camera
+        self.original_image = original_image
+        self.alpha_mask = alpha_mask
+        self.invdepthmap = invdepthmap
+
+class CameraPrefetcher:
+    """
+    Draws training cameras from a camera sampler (by default the uniform one, in
+    the order of the random pops from a viewpoint stack that train.py did), and
+    stages the ground truth of the next `prefetch` cameras ahead of use.
+
+    Staging runs on a background thread: the stored tensors (float32 or uint8) are
+    copied to pinned memory and uploaded with non-blocking copies on a side
+    stream, so the transfer of upcoming views overlaps the render and backward
+    pass of the current one. With prefetch 0 the tensors are fetched on demand.
+    """
+
+    def __init__(self, cameras, prefetch=0, sampler=None):
+        self.cameras = cameras
+        self.prefetch = prefetch
+        self.sampler = sampler if sampler is not None else UniformCameraSampler(cameras)
+        self.pending = deque()
+        self.stream = None
+        self.worker = None
+        if prefetch > 0 and torch.cuda.is_available():
+            self.stream = torch.cuda.Stream()
+            self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera_prefetch")
+
+    def _draw(self):
+        return self.sampler.draw()
+
+    @staticmethod
+    def _upload(tensor):
+        if tensor is None:
+            return None
+        if tensor.is_cuda:
+            return tensor
+        return tensor.pin_memory().to("cuda", non_blocking=True)
+
+    def _stage(self, camera):
+        with torch.cuda.stream(self.stream):
+            original_image, alpha_mask = camera.stored_image_tensors()
+            staged = [self._upload(original_image), self._upload(alpha_mask), self._upload(camera.invdepthmap)]
+            ready = torch.cuda.Event()
+            ready.record(self.stream)
+        return staged, ready
+
+    def _view(self, camera, staged, ready):
+        current = torch.cuda.current_stream()
+        current.wait_event(ready)
+        for tensor in staged:
+            if tensor is not None:
+                # Allocated on the side stream, keep the memory alive until the training stream is done with it
+                tensor.record_stream(current)
+        original_image, alpha_mask, invdepthmap = staged
+        return TrainingView(camera, image_to_float(original_image), image_to_float(alpha_mask), invdepthmap)
+
+    def next(self):
+        if self.worker is None:
+            camera = self._draw()
+            invdepthmap = camera.invdepthmap.cuda() if camera.invdepthmap is not None else None
+            alpha_mask = camera.alpha_mask
+            return TrainingView(camera, camera.original_image.cuda(), alpha_mask.cuda() if alpha_mask is not None else None,
+                                invdepthmap)
+
+        while len(self.pending) <= self.prefetch:
+            camera = self._draw()
+            self.pending.append((camera, self.worker.submit(self._stage, camera)))
+        camera, future = self.pending.popleft()
+        staged, ready = future.result()
+        return self._view(camera, staged, ready)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.shutdown(wait=True)
+        self.pending.clear()
@@ -0,0 +1,93 @@
+import torch
+import random
+import bisect
+
+class UniformCameraSampler:
+    """
+    Draws cameras uniformly without replacement: every camera once per epoch, in
+    a random order. With seed < 0 the global `random` state is used, which gives
+    the same order as the original viewpoint stack; otherwise a private generator
+    makes the order reproducible on its own.
+    """
+
+    def __init__(self, cameras, seed=-1):
+        self.cameras = list(cameras)
+        self.rng = random.Random(seed) if seed >= 0 else random
+        self.stack = []
+
+    def draw(self):
+        if not self.stack:
+            self.stack = list(self.cameras)
+        return self.stack.pop(self.rng.randint(0, len(self.stack) - 1))
+
+    def update(self, camera, loss):
+        pass
+
+class LossWeightedCameraSampler:
+    """
+    Draws cameras with probability proportional to a running estimate of their
+    training loss, so views that are still poorly reconstructed are visited more
+    often than converged ones.
+
+    update() folds a view's loss into an exponential moving average kept on the
+    device, without synchronizing. Every refresh_interval draws the averages are
+    copied to the host and the sampling distribution is rebuilt:
+    p = floor / N + (1 - floor) * loss / sum(loss). The floor keeps every camera
+    reachable; cameras that were never rendered are scored like the worst seen one.
+    """
+
+    def __init__(self, cameras, floor=0.2, decay=0.9, refresh_interval=100, seed=-1):
+        self.cameras = list(cameras)
+        self.index = {id(camera): idx for idx, camera in enumerate(self.cameras)}
+        self.floor = min(max(floor, 0.0), 1.0)
+        self.decay = decay
+        self.refresh_interval = max(1, refresh_interval)
+        self.rng = random.Random(seed) if seed >= 0 else random
+        self.scores = None
+        self.seen = [False] * len(self.cameras)
+        self.cum_weights = None
+        self.draws = 0
+
+    def _refresh(self):
+        count = len(self.cameras)
+        weights = [1.0] * count
+        if self.scores is not None:
+            scores = self.scores.tolist()
+            seen_scores = [score for score, seen in zip(scores, self.seen) if seen]
+            worst = max(seen_scores) if seen_scores else 1.0
+            weights = [score if seen else worst for score, seen in zip(scores, self.seen)]
+        total = sum(weights)
+        if total <= 0:
+            weights, total = [1.0] * count, float(count)
+        probabilities = [self.floor / count + (1.0 - self.floor) * weight / total for weight in weights]
+        self.cum_weights = []
+        running = 0.0
+        for probability in probabilities:
+            running += probability
+            self.cum_weights.append(running)
+
+    def draw(self):
+        if self.cum_weights is None or self.draws % self.refresh_interval == 0:
+            self._refresh()
+        self.draws += 1
+        idx = min(bisect.bisect_right(self.cum_weights, self.rng.random() * self.cum_weights[-1]), len(self.cameras) - 1)
+        return self.cameras[idx]
+
+    def update(self, camera, loss):
+        idx = self.index[id(camera)]
+        loss = loss.detach().float().reshape(())
+        if self.scores is None:
+            self.scores = torch.zeros(len(self.cameras), device=loss.device)
+        if self.seen[idx]:
+            self.scores[idx] = self.decay * self.scores[idx] + (1.0 - self.decay) * loss
+        else:
+            self.scores[idx] = loss
+            self.seen[idx] = True
+
+def make_camera_sampler(cameras, opt):
+    if opt.camera_sampling == "uniform":
+        return UniformCameraSampler(cameras, opt.camera_sampling_seed)
+    if opt.camera_sampling == "loss":
+        return LossWeightedCameraSampler(cameras, opt.camera_sampling_floor, opt.camera_sampling_decay,
+                                         opt.camera_sampling_refresh, opt.camera_sampling_seed)
+    raise ValueError("Unknown camera sampling '{}', expected 'uniform' or 'loss'".format(opt.camera_sampling))
@@ -12,15 +12,56 @@
 import torch
 from torch import nn
 import numpy as np
-from utils.graphics_utils import getWorld2View2, getProjectionMatrix
-from utils.general_utils import PILtoTorch
-import cv2
+from scene.camera_bank import CameraBank
+from utils.general_utils import ArrayToTorch
+
+def load_image_tensors(image, resolution, train_test_exp, is_test_dataset, is_test_view, compact=False):
+    """
+    Resizes a PIL image (or takes an already resized uint8 array) and returns its
+    (3, H, W) ground truth and (1, H, W) alpha mask as float32 CPU tensors.
+    With compact, both are returned as uint8 instead and the alpha mask is None
+    when it would be all ones; a writable np.memmap (shared image store) is then
+    wrapped without copying, the ground truth being a view of the mapped pages.
+    """
+    if not isinstance(image, np.ndarray):
+        image = image.resize(resolution)
+    share = compact and isinstance(image, np.memmap) and image.flags.writeable
+    resized_image_rgb = ArrayToTorch(image, normalize=not compact, copy=not share)
+    one = 255 if compact else 1.0
+    gt_image = resized_image_rgb[:3, ...]
+    if resized_image_rgb.shape[0] == 4:
+        alpha_mask = resized_image_rgb[3:4, ...].clone() if share else resized_image_rgb[3:4, ...]
+        if compact and not (train_test_exp and is_test_view) and bool((alpha_mask == one).all()):
+            alpha_mask = None
+    elif compact and not (train_test_exp and is_test_view):
+        alpha_mask = None
+    else:
+        alpha_mask = torch.full_like(resized_image_rgb[0:1, ...], one)
+
+    if train_test_exp and is_test_view:
+        if is_test_dataset:
+            alpha_mask[..., :alpha_mask.shape[-1] // 2] = 0
+        else:
+            alpha_mask[..., alpha_mask.shape[-1] // 2:] = 0
+
+    if share:
+        return gt_image, alpha_mask
+    if compact:
+        return gt_image.contiguous(), alpha_mask
+    return gt_image.clamp(0.0, 1.0), alpha_mask
+
+def image_to_float(image):
+    # uint8 storage is expanded on the training device, float storage is returned as is
+    if image is None or image.dtype != torch.uint8:
+        return image
+    return image.to("cuda", non_blocking=True).float() / 255.0
 
 class Camera(nn.Module):
     def __init__(self, resolution, colmap_id, R, T, FoVx, FoVy, depth_params, image, invdepthmap,
                  image_name, uid,
                  trans=np.array([0.0, 0.0, 0.0]), scale=1.0, data_device = "cuda",
-                 train_test_exp = False, is_test_dataset = False, is_test_view = False
+                 train_test_exp = False, is_test_dataset = False, is_test_view = False,
+                 image_loader = None, image_cache = None, compact_images = False, half_depth = False
                  ):
         super(Camera, self).__init__()
 
@@ -39,43 +80,42 @@ class Camera(nn.Module):
             print(f"[Warning] Custom device {data_device} failed, fallback to default cuda device" )
             self.data_device = torch.device("cuda")
 
-        resized_image_rgb = PILtoTorch(image, resolution)
-        gt_image = resized_image_rgb[:3, ...]
-        self.alpha_mask = None
-        if resized_image_rgb.shape[0] == 4:
-            self.alpha_mask = resized_image_rgb[3:4, ...].to(self.data_device)
-        else: 
-            self.alpha_mask = torch.ones_like(resized_image_rgb[0:1, ...].to(self.data_device))
-
-        if train_test_exp and is_test_view:
-            if is_test_dataset:
-                self.alpha_mask[..., :self.alpha_mask.shape[-1] // 2] = 0
-            else:
-                self.alpha_mask[..., self.alpha_mask.shape[-1] // 2:] = 0
-
-        self.original_image = gt_image.clamp(0.0, 1.0).to(self.data_device)
-        self.image_width = self.original_image.shape[2]
-        self.image_height = self.original_image.shape[1]
+        self._image_loader = image_loader
+        self._image_cache = image_cache
+        self._image_key = (image_name, tuple(resolution), is_test_dataset)
+        self._lazy_image = image is None
+        if image is not None:
+            gt_image, alpha_mask = load_image_tensors(image, resolution, train_test_exp, is_test_dataset, is_test_view, compact_images)
+            self._original_image = gt_image.to(self.data_device)
+            self._alpha_mask = alpha_mask.to(self.data_device) if alpha_mask is not None else None
+            self.image_width = self._original_image.shape[2]
+            self.image_height = self._original_image.shape[1]
+        else:
+            # Lazy camera: tensors are materialized on access through image_cache
+            self._original_image = None
+            self._alpha_mask = None
+            self.image_width, self.image_height = resolution
 
         self.invdepthmap = None
         self.depth_reliable = False
         if invdepthmap is not None:
-            self.depth_mask = torch.ones_like(self.alpha_mask)
-            self.invdepthmap = cv2.resize(invdepthmap, resolution)
-            self.invdepthmap[self.invdepthmap < 0] = 0
             self.depth_reliable = True
-
             if depth_params is not None:
+                # Priors with an outlying scale are not used
                 if depth_params["scale"] < 0.2 * depth_params["med_scale"] or depth_params["scale"] > 5 * depth_params["med_scale"]:
                     self.depth_reliable = False
-                    self.depth_mask *= 0
-                
-                if depth_params["scale"] > 0:
-                    self.invdepthmap = self.invdepthmap * depth_params["scale"] + depth_params["offset"]
+
+        if self.depth_reliable:
+            import cv2
+            self.invdepthmap = cv2.resize(invdepthmap, resolution)
+            self.invdepthmap[self.invdepthmap < 0] = 0
+
+            if depth_params is not None and depth_params["scale"] > 0:
+                self.invdepthmap = self.invdepthmap * depth_params["scale"] + depth_params["offset"]
 
             if self.invdepthmap.ndim != 2:
                 self.invdepthmap = self.invdepthmap[..., 0]
-            self.invdepthmap = torch.from_numpy(self.invdepthmap[None]).to(self.data_device)
+            self.invdepthmap = torch.from_numpy(self.invdepthmap[None]).to(self.data_device, torch.float16 if half_depth else torch.float32)
 
         self.zfar = 100.0
         self.znear = 0.01
@@ -83,10 +123,54 @@ class Camera(nn.Module):
         self.trans = trans
         self.scale = scale
 
-        self.world_view_transform = torch.tensor(getWorld2View2(R, T, trans, scale)).transpose(0, 1).cuda()
-        self.projection_matrix = getProjectionMatrix(znear=self.znear, zfar=self.zfar, fovX=self.FoVx, fovY=self.FoVy).transpose(0,1).cuda()
-        self.full_proj_transform = (self.world_view_transform.unsqueeze(0).bmm(self.projection_matrix.unsqueeze(0))).squeeze(0)
-        self.camera_center = self.world_view_transform.inverse()[3, :3]
+        # Matrices live in a CameraBank shared by the camera list, see attach_bank
+        self.bank = None
+        self.bank_index = None
+
+    def attach_bank(self, bank, index):
+        self.bank = bank
+        self.bank_index = index
+
+    def _bank(self):
+        if self.bank is None:
+            CameraBank([self])
+        return self.bank
+
+    @property
+    def world_view_transform(self):
+        return self._bank().world_view_transform[self.bank_index]
+
+    @property
+    def projection_matrix(self):
+        return self._bank().projection_matrix[self.bank_index]
+
+    @property
+    def full_proj_transform(self):
+        return self._bank().full_proj_transform[self.bank_index]
+
+    @property
+    def camera_center(self):
+        return self._bank().camera_center[self.bank_index]
+
+    def stored_image_tensors(self):
+        """ (ground truth, alpha mask) as stored: float32 or uint8 (compact_images), on data_device. """
+        if self._lazy_image:
+            return self._image_cache.get(self._image_key, self._image_loader)
+        return self._original_image, self._alpha_mask
+
+    @property
+    def original_image(self):
+        return image_to_float(self.stored_image_tensors()[0])
+
+    @property
+    def alpha_mask(self):
+        return image_to_float(self.stored_image_tensors()[1])
+
+    def image_memory_bytes(self):
+        """ Bytes held by the stored ground truth (0 for lazy cameras). """
+        if self._lazy_image:
+            return 0
+        return sum(t.numel() * t.element_size() for t in (self._original_image, self._alpha_mask) if t is not None)
         
 class MiniCam:
     def __init__(self, width, height, fovy, fovx, znear, zfar, world_view_transform, full_proj_transform):
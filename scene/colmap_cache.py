@@ -0,0 +1,163 @@
+import os
+import json
+import threading
+import numpy as np
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from scene.colmap_loader import Camera, Image, read_intrinsics_text, read_intrinsics_binary
+from utils.read_write_model import read_images_binary_arrays, read_points3D_binary_arrays, read_images_text_arrays, \
+    read_points3D_text_arrays
+
+# Bump when the layout below changes, older caches are then rebuilt
+CACHE_VERSION = 2
+CACHE_DIR = "parsed_cache"
+MAX_CAMERA_PARAMS = 12
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _pick_source(sparse_dir, name):
+    for ext in (".bin", ".txt"):
+        path = os.path.join(sparse_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _parse_cameras(path):
+    cameras = read_intrinsics_binary(path) if path.endswith(".bin") else read_intrinsics_text(path)
+    params = np.zeros((len(cameras), MAX_CAMERA_PARAMS))
+    num_params = np.zeros(len(cameras), dtype=np.int64)
+    for idx, cam in enumerate(cameras.values()):
+        params[idx, :len(cam.params)] = cam.params
+        num_params[idx] = len(cam.params)
+    return {
+        "camera_ids": np.array([cam.id for cam in cameras.values()], dtype=np.int64),
+        "camera_models": np.array([cam.model for cam in cameras.values()]),
+        "camera_widths": np.array([cam.width for cam in cameras.values()], dtype=np.int64),
+        "camera_heights": np.array([cam.height for cam in cameras.values()], dtype=np.int64),
+        "camera_params": params,
+        "camera_num_params": num_params
+    }
+
+def _parse_images(path):
+    arrays = read_images_binary_arrays(path) if path.endswith(".bin") else read_images_text_arrays(path)
+    return {
+        "image_ids": arrays["ids"],
+        "image_qvecs": arrays["qvecs"],
+        "image_tvecs": arrays["tvecs"],
+        "image_camera_ids": arrays["camera_ids"],
+        "image_names": np.array(arrays["names"]),
+        "points2D_offsets": arrays["points2D_offsets"],
+        "points2D_xys": arrays["xys"],
+        "points2D_point3D_ids": arrays["point3D_ids"]
+    }
+
+def _parse_points(path):
+    arrays = read_points3D_binary_arrays(path) if path.endswith(".bin") else read_points3D_text_arrays(path)
+    return {
+        "points_xyz": arrays["xyz"],
+        "points_rgb": arrays["rgb"],
+        "points_error": arrays["error"],
+        "points_track_offsets": arrays["track_offsets"],
+        "points_track_image_ids": arrays["image_ids"],
+        "points_track_point2D_idxs": arrays["point2D_idxs"]
+    }
+
+def _load_cache(cache_dir, sources):
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != CACHE_VERSION or manifest.get("sources") != sources:
+        return None
+    return {name: np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r") for name in manifest["arrays"]}
+
+def _replace_file(path, write):
+    # Readers may have the old file memory-mapped: write aside and swap the inode, never truncate in place
+    tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _write_cache(cache_dir, sources, columns):
+    os.makedirs(cache_dir, exist_ok=True)
+    # Drop a stale manifest first so an interrupted write is never picked up
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name, array in columns.items():
+        _replace_file(os.path.join(cache_dir, name + ".npy"), lambda f: np.save(f, np.ascontiguousarray(array)))
+    manifest = {"version": CACHE_VERSION, "sources": sources, "arrays": list(columns.keys())}
+    _replace_file(manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+def read_colmap_model(sparse_dir, use_cache=True):
+    """
+    Reads cameras, images and points3D of a COLMAP model (.bin, or .txt as a
+    fallback) through a columnar cache in sparse_dir/parsed_cache. The cache holds
+    one .npy per column and a manifest with the size and mtime of every source
+    file; it is memory-mapped on load and rebuilt when a source changes.
+
+    Returns (cam_extrinsics, cam_intrinsics, columns): the first two are the dicts
+    produced by read_extrinsics_* / read_intrinsics_*, columns holds the flat
+    arrays, including points_xyz / points_rgb / points_error and the tracks
+    (points_track_* with points_track_offsets), absent if there is no points3D file.
+    """
+    paths = {name: _pick_source(sparse_dir, name) for name in ("cameras", "images", "points3D")}
+    if paths["cameras"] is None or paths["images"] is None:
+        raise FileNotFoundError("No COLMAP cameras/images found in {}".format(sparse_dir))
+    sources = {name: dict(_source_stamp(path), file=os.path.basename(path)) for name, path in paths.items() if path is not None}
+    cache_dir = os.path.join(sparse_dir, CACHE_DIR)
+
+    columns = _load_cache(cache_dir, sources) if use_cache else None
+    lock_file = None
+    try:
+        if columns is None and use_cache and fcntl is not None:
+            # Jobs starting together on one dataset: the first parses and writes, the others wait and load its cache
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                lock_file = open(os.path.join(cache_dir, "cache.lock"), "w")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                columns = _load_cache(cache_dir, sources)
+            except OSError:
+                pass
+        if columns is None:
+            columns = _parse_cameras(paths["cameras"])
+            columns.update(_parse_images(paths["images"]))
+            if paths["points3D"] is not None:
+                columns.update(_parse_points(paths["points3D"]))
+            if use_cache:
+                try:
+                    _write_cache(cache_dir, sources, columns)
+                    columns = _load_cache(cache_dir, sources)
+                except OSError as e:
+                    print("Could not write the COLMAP cache to {}: {}".format(cache_dir, e))
+        else:
+            print("Loaded parsed COLMAP model from {}".format(cache_dir))
+    finally:
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    cam_intrinsics = {}
+    for idx, camera_id in enumerate(columns["camera_ids"].tolist()):
+        cam_intrinsics[camera_id] = Camera(id=camera_id, model=str(columns["camera_models"][idx]),
+                                           width=int(columns["camera_widths"][idx]), height=int(columns["camera_heights"][idx]),
+                                           params=np.array(columns["camera_params"][idx, :columns["camera_num_params"][idx]]))
+
+    cam_extrinsics = {}
+    offsets = columns["points2D_offsets"]
+    for idx, image_id in enumerate(columns["image_ids"].tolist()):
+        start, end = offsets[idx], offsets[idx + 1]
+        cam_extrinsics[image_id] = Image(id=image_id, qvec=np.array(columns["image_qvecs"][idx]), tvec=np.array(columns["image_tvecs"][idx]),
+                                         camera_id=int(columns["image_camera_ids"][idx]), name=str(columns["image_names"][idx]),
+                                         xys=columns["points2D_xys"][start:end], point3D_ids=columns["points2D_point3D_ids"][start:end])
+    return cam_extrinsics, cam_intrinsics, columns
@@ -1,18 +1,15 @@
 import torch
 import numpy as np
-from utils.general_utils import inverse_sigmoid, get_expon_lr_func, build_rotation
+from utils.general_utils import inverse_sigmoid, get_expon_lr_func, compress_lr_func, build_rotation, morton_codes
 from torch import nn
 import os
 import json
 from utils.system_utils import mkdir_p
-from plyfile import PlyData, PlyElement
+from utils.ply_utils import write_ply_binary, submit_ply_write, reserve_ply_write_slot, memmap_ply_vertices
+from numpy.lib.recfunctions import structured_to_unstructured
 from utils.sh_utils import RGB2SH
-from simple_knn._C import distCUDA2
 from utils.graphics_utils import BasicPointCloud
 from utils.general_utils import strip_symmetric, build_scaling_rotation
-from sklearn.cluster import DBSCAN
-from sklearn.preprocessing import StandardScaler
-from sklearn.neighbors import NearestNeighbors
 
 try:
     from diff_gaussian_rasterization import SparseGaussianAdam
@@ -52,12 +49,16 @@ class GaussianModel:
         self.max_radii2D = torch.empty(0)
         self.xyz_gradient_accum = torch.empty(0)
         self.denom = torch.empty(0)
+        self.tmp_radii = None
         self.optimizer = None
         self.percent_dense = 0
         self.spatial_lr_scale = 0
         self.apply_dbscan = apply_dbscan
         self.pruning_count = 0
         self.cluster_centers = torch.empty(0, device="cuda")
+        # Bumped whenever Gaussians are added, removed or reordered so that caches
+        # holding per-Gaussian indices (e.g. VisibilityCache) know to drop them
+        self.topology_version = 0
         self.setup_functions()
 
     def capture(self):
@@ -97,6 +98,7 @@ class GaussianModel:
             self.cluster_centers,
             self._xyz_initial
         ) = model_args
+        self.topology_version += 1
         self.training_setup(training_args)
         self.xyz_gradient_accum = xyz_gradient_accum
         self.denom = denom
@@ -184,6 +186,9 @@ class GaussianModel:
 
 
         if self.DBSCAN_flag:
+            # scikit-learn is only imported by runs that denoise
+            from sklearn.cluster import DBSCAN
+            from sklearn.preprocessing import StandardScaler
             # **DBSCAN-Based Pruning Starts Here**
             # Step 1: Prepare data for DBSCAN
             points_cpu = fused_point_cloud.cpu().numpy()
@@ -262,6 +267,7 @@ class GaussianModel:
         
 
         # Compute squared distances and initialize scaling factors
+        from simple_knn._C import distCUDA2
         dist2 = torch.clamp_min(distCUDA2(fused_point_cloud), 1e-7)
         scales = torch.log(torch.sqrt(dist2))[..., None].repeat(1, 3)
         rots = torch.zeros((fused_point_cloud.shape[0], 4), device="cuda")
@@ -281,6 +287,7 @@ class GaussianModel:
         self._rotation = nn.Parameter(rots.requires_grad_(True))
         self._opacity = nn.Parameter(opacities.requires_grad_(True))
         self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device="cuda")
+        self.topology_version += 1
 
         print(f"Initial number of Gaussians: {self.get_xyz.shape[0]}")
 
@@ -310,6 +317,7 @@ class GaussianModel:
         points_cpu = points.detach().cpu().numpy()
 
         print("Computing nearest neighbors on CPU...")
+        from sklearn.neighbors import NearestNeighbors
         # Initialize NearestNeighbors with k=2 (self + nearest neighbor)
         nbrs = NearestNeighbors(n_neighbors=2, algorithm='auto', metric='euclidean').fit(points_cpu)
         
@@ -379,6 +387,13 @@ class GaussianModel:
                                                         lr_delay_mult=training_args.exposure_lr_delay_mult,
                                                         max_steps=training_args.iterations)
 
+    def shorten_schedule(self, iteration, end_iteration, training_args):
+        ''' Compresses the remaining learning rate decay so it reaches its final value at end_iteration '''
+        self.xyz_scheduler_args = compress_lr_func(self.xyz_scheduler_args, training_args.position_lr_final*self.spatial_lr_scale,
+                                                   iteration, end_iteration)
+        self.exposure_scheduler_args = compress_lr_func(self.exposure_scheduler_args, training_args.exposure_lr_final,
+                                                        iteration, end_iteration)
+
     def update_learning_rate(self, iteration):
         ''' Learning rate scheduling per step '''
         if self.pretrained_exposures is None:
@@ -405,32 +420,55 @@ class GaussianModel:
             l.append('rot_{}'.format(i))
         return l
 
-    def save_ply(self, path):
+    def save_ply(self, path, async_write=False, morton_order=False):
+        """
+        Writes the Gaussians as a binary PLY. With async_write, the attributes are
+        copied into pinned host memory with a non-blocking transfer and the encode /
+        write happens on a background thread; the returned future completes when the
+        file is on disk (see utils.ply_utils.wait_for_ply_writes). With morton_order,
+        the rows are written in Morton order without touching the training state.
+        """
         mkdir_p(os.path.dirname(path))
 
-        xyz = self._xyz.detach().cpu().numpy()
-        normals = np.zeros_like(xyz)
-        f_dc = self._features_dc.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
-        f_rest = self._features_rest.detach().transpose(1, 2).flatten(start_dim=1).contiguous().cpu().numpy()
-        opacities = self._opacity.detach().cpu().numpy()
-        scale = self._scaling.detach().cpu().numpy()
-        rotation = self._rotation.detach().cpu().numpy()
-
-        dtype_full = [(attribute, 'f4') for attribute in self.construct_list_of_attributes()]
-
-        elements = np.empty(xyz.shape[0], dtype=dtype_full)
-        attributes = np.concatenate((xyz, normals, f_dc, f_rest, opacities, scale, rotation), axis=1)
-        elements[:] = list(map(tuple, attributes))
-        el = PlyElement.describe(elements, 'vertex')
-        PlyData([el]).write(path)
+        with torch.no_grad():
+            xyz = self._xyz.detach()
+            normals = torch.zeros_like(xyz)
+            f_dc = self._features_dc.detach().transpose(1, 2).flatten(start_dim=1)
+            f_rest = self._features_rest.detach().transpose(1, 2).flatten(start_dim=1)
+            attributes = torch.cat((xyz, normals, f_dc, f_rest, self._opacity.detach(), self._scaling.detach(), self._rotation.detach()), dim=1).float()
+            if morton_order and xyz.shape[0] > 0:
+                attributes = attributes[torch.argsort(morton_codes(xyz))]
+
+        attribute_names = self.construct_list_of_attributes()
+        if not async_write:
+            write_ply_binary(path, attribute_names, attributes.cpu().numpy())
+            return None
+
+        reserve_ply_write_slot()
+        host_attributes = torch.empty(attributes.shape, dtype=attributes.dtype, pin_memory=True)
+        host_attributes.copy_(attributes, non_blocking=True)
+        copy_done = torch.cuda.Event()
+        copy_done.record()
+        return submit_ply_write(path, attribute_names, host_attributes, copy_done)
 
     def reset_opacity(self):
         opacities_new = self.inverse_opacity_activation(torch.min(self.get_opacity, torch.ones_like(self.get_opacity)*0.01))
         optimizable_tensors = self.replace_tensor_to_optimizer(opacities_new, "opacity")
         self._opacity = optimizable_tensors["opacity"]
 
-    def load_ply(self, path, use_train_test_exp = False):
-        plydata = PlyData.read(path)
+    def load_ply(self, path, use_train_test_exp = False, attributes = None, rows = None):
+        """
+        Loads a trained model. Binary files are memory-mapped and every parameter is
+        built from one strided view over its columns; ASCII files go through plyfile.
+
+        Args:
+            attributes: optional subset of ("xyz", "f_dc", "f_rest", "opacity", "scaling", "rotation")
+                        to load. Skipped SH rest coefficients are zero-filled, other skipped
+                        parameters are reset to empty (N, 0[, 3]) tensors, so no state of a
+                        previously loaded model is kept.
+            rows: optional slice / index array selecting a subset of Gaussians.
+        """
+        self.pretrained_exposures = None
         if use_train_test_exp:
             exposure_file = os.path.join(os.path.dirname(path), os.pardir, os.pardir, "exposure.json")
             if os.path.exists(exposure_file):
@@ -442,45 +480,64 @@ class GaussianModel:
                 print(f"No exposure to be loaded at {exposure_file}")
                 self.pretrained_exposures = None
 
-        xyz = np.stack((np.asarray(plydata.elements[0]["x"]),
-                        np.asarray(plydata.elements[0]["y"]),
-                        np.asarray(plydata.elements[0]["z"])),  axis=1)
-        opacities = np.asarray(plydata.elements[0]["opacity"])[..., np.newaxis]
-
-        features_dc = np.zeros((xyz.shape[0], 3, 1))
-        features_dc[:, 0, 0] = np.asarray(plydata.elements[0]["f_dc_0"])
-        features_dc[:, 1, 0] = np.asarray(plydata.elements[0]["f_dc_1"])
-        features_dc[:, 2, 0] = np.asarray(plydata.elements[0]["f_dc_2"])
-
-        extra_f_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("f_rest_")]
-        extra_f_names = sorted(extra_f_names, key = lambda x: int(x.split('_')[-1]))
-        assert len(extra_f_names)==3*(self.max_sh_degree + 1) ** 2 - 3
-        features_extra = np.zeros((xyz.shape[0], len(extra_f_names)))
-        for idx, attr_name in enumerate(extra_f_names):
-            features_extra[:, idx] = np.asarray(plydata.elements[0][attr_name])
-        # Reshape (P,F*SH_coeffs) to (P, F, SH_coeffs except DC)
-        features_extra = features_extra.reshape((features_extra.shape[0], 3, (self.max_sh_degree + 1) ** 2 - 1))
-
-        scale_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("scale_")]
-        scale_names = sorted(scale_names, key = lambda x: int(x.split('_')[-1]))
-        scales = np.zeros((xyz.shape[0], len(scale_names)))
-        for idx, attr_name in enumerate(scale_names):
-            scales[:, idx] = np.asarray(plydata.elements[0][attr_name])
-
-        rot_names = [p.name for p in plydata.elements[0].properties if p.name.startswith("rot")]
-        rot_names = sorted(rot_names, key = lambda x: int(x.split('_')[-1]))
-        rots = np.zeros((xyz.shape[0], len(rot_names)))
-        for idx, attr_name in enumerate(rot_names):
-            rots[:, idx] = np.asarray(plydata.elements[0][attr_name])
-
-        self._xyz = nn.Parameter(torch.tensor(xyz, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._features_dc = nn.Parameter(torch.tensor(features_dc, dtype=torch.float, device="cuda").transpose(1, 2).contiguous().requires_grad_(True))
-        self._features_rest = nn.Parameter(torch.tensor(features_extra, dtype=torch.float, device="cuda").transpose(1, 2).contiguous().requires_grad_(True))
-        self._opacity = nn.Parameter(torch.tensor(opacities, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._scaling = nn.Parameter(torch.tensor(scales, dtype=torch.float, device="cuda").requires_grad_(True))
-        self._rotation = nn.Parameter(torch.tensor(rots, dtype=torch.float, device="cuda").requires_grad_(True))
-
-        self.active_sh_degree = self.max_sh_degree
+        try:
+            vertices = memmap_ply_vertices(path)
+        except ValueError:
+            from plyfile import PlyData
+            vertices = PlyData.read(path).elements[0].data
+        if rows is not None:
+            vertices = vertices[rows]
+        if attributes is None:
+            attributes = ("xyz", "f_dc", "f_rest", "opacity", "scaling", "rotation")
+
+        def sorted_names(prefix):
+            names = [name for name in vertices.dtype.names if name.startswith(prefix)]
+            return sorted(names, key = lambda x: int(x.split('_')[-1]))
+
+        def columns(names):
+            if not names:
+                # e.g. no f_rest_* with sh_degree 0
+                return torch.empty((vertices.shape[0], 0), dtype=torch.float, device="cuda")
+            # Consecutive same-typed fields form a single strided view; np.array is the one host copy
+            view = structured_to_unstructured(vertices[names])
+            return torch.from_numpy(np.array(view, dtype=np.float32)).to("cuda")
+
+        num_points = vertices.shape[0]
+        num_rest = (self.max_sh_degree + 1) ** 2 - 1
+
+        def empty(*shape):
+            return nn.Parameter(torch.empty((num_points, *shape), dtype=torch.float, device="cuda").requires_grad_(True))
+
+        # Skipped parameters do not keep tensors of the previous state (with a different row count)
+        self._xyz = empty(0)
+        self._features_dc = empty(0, 3)
+        self._opacity = empty(0)
+        self._scaling = empty(0)
+        self._rotation = empty(0)
+        self._xyz_initial = torch.empty(0)
+
+        if "xyz" in attributes:
+            self._xyz = nn.Parameter(columns(["x", "y", "z"]).requires_grad_(True))
+        if "f_dc" in attributes:
+            features_dc = columns(["f_dc_0", "f_dc_1", "f_dc_2"]).reshape(num_points, 3, 1)
+            self._features_dc = nn.Parameter(features_dc.transpose(1, 2).contiguous().requires_grad_(True))
+        if "f_rest" in attributes:
+            extra_f_names = sorted_names("f_rest_")
+            assert len(extra_f_names)==3*(self.max_sh_degree + 1) ** 2 - 3
+            # Reshape (P,F*SH_coeffs) to (P, F, SH_coeffs except DC)
+            features_extra = columns(extra_f_names).reshape(num_points, 3, num_rest)
+            self._features_rest = nn.Parameter(features_extra.transpose(1, 2).contiguous().requires_grad_(True))
+        else:
+            self._features_rest = nn.Parameter(torch.zeros((num_points, num_rest, 3), dtype=torch.float, device="cuda").requires_grad_(True))
+        if "opacity" in attributes:
+            self._opacity = nn.Parameter(columns(["opacity"]).requires_grad_(True))
+        if "scaling" in attributes:
+            self._scaling = nn.Parameter(columns(sorted_names("scale_")).requires_grad_(True))
+        if "rotation" in attributes:
+            self._rotation = nn.Parameter(columns(sorted_names("rot")).requires_grad_(True))
+
+        self.active_sh_degree = self.max_sh_degree if "f_rest" in attributes else 0
+        self.topology_version += 1
 
     def replace_tensor_to_optimizer(self, tensor, name):
         optimizable_tensors = {}
@@ -515,8 +572,21 @@ class GaussianModel:
                 optimizable_tensors[group["name"]] = group["params"][0]
         return optimizable_tensors
 
+    def _index_xyz_initial(self, index, count):
+        """
+        Applies a prune mask or permutation over `count` Gaussians to _xyz_initial,
+        which must stay row-aligned with the parameters. Models loaded from a PLY
+        have no initial positions (empty tensor) and are left as they are.
+        """
+        if self._xyz_initial.numel() == 0:
+            return
+        if self._xyz_initial.shape[0] != count:
+            raise RuntimeError("_xyz_initial has {} rows but the model has {} Gaussians".format(self._xyz_initial.shape[0], count))
+        self._xyz_initial = self._xyz_initial[index]
+
     def prune_points(self, mask):
         valid_points_mask = ~mask
+        self._index_xyz_initial(valid_points_mask, mask.shape[0])
         optimizable_tensors = self._prune_optimizer(valid_points_mask)
 
         self._xyz = optimizable_tensors["xyz"]
@@ -530,7 +600,49 @@ class GaussianModel:
 
         self.denom = self.denom[valid_points_mask]
         self.max_radii2D = self.max_radii2D[valid_points_mask]
-        self.tmp_radii = self.tmp_radii[valid_points_mask]
+        if self.tmp_radii is not None:
+            self.tmp_radii = self.tmp_radii[valid_points_mask]
+        self.topology_version += 1
+
+    def reorder_morton(self):
+        """
+        Sorts all per-Gaussian state (parameters, Adam moments, _xyz_initial and the
+        densification statistics) by the Morton code of the positions, so that
+        Gaussians close in space are close in memory.
+        """
+        if self.get_xyz.shape[0] == 0:
+            return
+        with torch.no_grad():
+            order = torch.argsort(morton_codes(self._xyz.detach()))
+
+        if self.optimizer is not None:
+            # Indexing with a permutation instead of a mask reorders rows and moments alike
+            optimizable_tensors = self._prune_optimizer(order)
+        else:
+            optimizable_tensors = {
+                "xyz": nn.Parameter(self._xyz[order].requires_grad_(True)),
+                "f_dc": nn.Parameter(self._features_dc[order].requires_grad_(True)),
+                "f_rest": nn.Parameter(self._features_rest[order].requires_grad_(True)),
+                "opacity": nn.Parameter(self._opacity[order].requires_grad_(True)),
+                "scaling": nn.Parameter(self._scaling[order].requires_grad_(True)),
+                "rotation": nn.Parameter(self._rotation[order].requires_grad_(True))
+            }
+        self._xyz = optimizable_tensors["xyz"]
+        self._features_dc = optimizable_tensors["f_dc"]
+        self._features_rest = optimizable_tensors["f_rest"]
+        self._opacity = optimizable_tensors["opacity"]
+        self._scaling = optimizable_tensors["scaling"]
+        self._rotation = optimizable_tensors["rotation"]
+
+        self._index_xyz_initial(order, order.shape[0])
+        if self.max_radii2D.shape[0] == order.shape[0]:
+            self.max_radii2D = self.max_radii2D[order]
+        if self.xyz_gradient_accum.shape[0] == order.shape[0]:
+            self.xyz_gradient_accum = self.xyz_gradient_accum[order]
+            self.denom = self.denom[order]
+        if self.tmp_radii is not None:
+            self.tmp_radii = self.tmp_radii[order]
+        self.topology_version += 1
 
     def cat_tensors_to_optimizer(self, tensors_dict):
         optimizable_tensors = {}
@@ -578,6 +690,7 @@ class GaussianModel:
         self.xyz_gradient_accum = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
         self.denom = torch.zeros((self.get_xyz.shape[0], 1), device="cuda")
         self.max_radii2D = torch.zeros((self.get_xyz.shape[0]), device="cuda")
+        self.topology_version += 1
 
 
         print(f"Densification complete. Total Gaussians after addition: {self.get_xyz.shape[0]}")
@@ -645,6 +758,38 @@ class GaussianModel:
 
         torch.cuda.empty_cache()
 
-    def add_densification_stats(self, viewspace_point_tensor, update_filter):
-        self.xyz_gradient_accum[update_filter] += torch.norm(viewspace_point_tensor.grad[update_filter,:2], dim=-1, keepdim=True)
+    def sparse_optimizer_step(self, indices):
+        """
+        Adam step restricted to the Gaussians in indices (e.g. the visibility cache
+        entry of the current view). Uses the same state layout as torch.optim.Adam,
+        so pruning, densification and checkpoints are unaffected.
+        """
+        indices = indices.long()
+        for group in self.optimizer.param_groups:
+            param = group["params"][0]
+            if param.grad is None:
+                continue
+            beta1, beta2 = group["betas"]
+            state = self.optimizer.state[param]
+            if len(state) == 0:
+                state["step"] = torch.tensor(0.0)
+                state["exp_avg"] = torch.zeros_like(param, memory_format=torch.preserve_format)
+                state["exp_avg_sq"] = torch.zeros_like(param, memory_format=torch.preserve_format)
+            state["step"] += 1
+            step = float(state["step"])
+
+            grad = param.grad[indices]
+            exp_avg = state["exp_avg"][indices].mul_(beta1).add_(grad, alpha=1 - beta1)
+            exp_avg_sq = state["exp_avg_sq"][indices].mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+            state["exp_avg"][indices] = exp_avg
+            state["exp_avg_sq"][indices] = exp_avg_sq
+
+            bias_correction1 = 1 - beta1 ** step
+            bias_correction2 = 1 - beta2 ** step
+            denom = (exp_avg_sq.sqrt() / (bias_correction2 ** 0.5)).add_(group["eps"])
+            param.data.index_add_(0, indices, exp_avg / denom, alpha=-group["lr"] / bias_correction1)
+
+    def add_densification_stats(self, viewspace_point_tensor, update_filter, grad_scale=1.0):
+        # grad_scale undoes a loss scaling, e.g. the 1/B of each view in a batch of B
+        self.xyz_gradient_accum[update_filter] += grad_scale * torch.norm(viewspace_point_tensor.grad[update_filter,:2], dim=-1, keepdim=True)
         self.denom[update_filter] += 1
@@ -0,0 +1,86 @@
+import torch
+import threading
+from collections import OrderedDict
+
+def _nbytes(tensors):
+    return sum(t.numel() * t.element_size() for t in tensors if t is not None)
+
+class _LRUTier:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def get(self, key):
+        tensors = self.entries.get(key)
+        if tensors is not None:
+            self.entries.move_to_end(key)
+        return tensors
+
+    def put(self, key, tensors):
+        size = _nbytes(tensors)
+        if key in self.entries or size > self.budget_bytes:
+            return
+        self.entries[key] = tensors
+        self.bytes += size
+        while self.bytes > self.budget_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= _nbytes(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+class ImageCache:
+    """
+    Two-tier LRU cache for the image tensors of lazily loaded cameras.
+
+    An entry is the tuple of tensors returned by a camera's loader (ground truth
+    image and alpha mask, which may be None). Decoded entries are kept in host
+    memory (pinned when the device is a GPU) and uploaded copies in device memory;
+    each tier evicts its least recently used entries beyond its byte budget. A
+    budget of 0 disables that tier, with both at 0 every access decodes the image
+    again.
+    """
+
+    def __init__(self, host_budget_bytes, device_budget_bytes, device="cuda"):
+        self.device = torch.device(device)
+        self.host = _LRUTier(host_budget_bytes)
+        self.resident = _LRUTier(device_budget_bytes)
+        self.hits = 0
+        self.misses = 0
+        # Cameras may be fetched from loader / prefetch threads
+        self.lock = threading.RLock()
+
+    def get(self, key, loader):
+        with self.lock:
+            return self._get(key, loader)
+
+    def _get(self, key, loader):
+        tensors = self.resident.get(key)
+        if tensors is not None:
+            self.hits += 1
+            return tensors
+
+        host_tensors = self.host.get(key)
+        if host_tensors is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            host_tensors = loader()
+            if self.device.type == "cuda":
+                host_tensors = tuple(t.pin_memory() if t is not None else None for t in host_tensors)
+            self.host.put(key, host_tensors)
+
+        tensors = tuple(t.to(self.device, non_blocking=True) if t is not None else None for t in host_tensors)
+        self.resident.put(key, tensors)
+        return tensors
+
+    def clear(self):
+        self.host.clear()
+        self.resident.clear()
+
+    def stats(self):
+        return {"host_entries": len(self.host.entries), "host_bytes": self.host.bytes,
+                "device_entries": len(self.resident.entries), "device_bytes": self.resident.bytes,
+                "hits": self.hits, "misses": self.misses}
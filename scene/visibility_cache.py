@@ -0,0 +1,45 @@
+import torch
+
+class VisibilityCache:
+    """
+    Per-camera cache of the Gaussians seen by each training view.
+
+    An entry is the sorted set of indices with radii > 0 from the last full render
+    of that camera, stored as an int32 tensor (half the size of the int64 indices
+    returned by nonzero()). Entries are dropped as soon as the Gaussian set changes
+    topology (densify_and_prune, prune_isolated_points, ...) and after
+    refresh_interval iterations, so Gaussians that drift into view are picked up
+    again by the next full render.
+    """
+
+    def __init__(self, refresh_interval=1000):
+        self.refresh_interval = refresh_interval
+        self.entries = {}
+        self.topology_version = -1
+
+    def _sync(self, gaussians):
+        if gaussians.topology_version != self.topology_version:
+            self.entries.clear()
+            self.topology_version = gaussians.topology_version
+
+    def get(self, camera, gaussians, iteration):
+        self._sync(gaussians)
+        entry = self.entries.get(camera.uid)
+        if entry is None:
+            return None
+        indices, stamp = entry
+        if self.refresh_interval > 0 and iteration - stamp >= self.refresh_interval:
+            del self.entries[camera.uid]
+            return None
+        return indices
+
+    def update(self, camera, gaussians, radii, iteration):
+        self._sync(gaussians)
+        indices = (radii > 0).nonzero().squeeze(-1).to(torch.int32)
+        self.entries[camera.uid] = (indices, iteration)
+
+    def clear(self):
+        self.entries.clear()
+
+    def memory_bytes(self):
+        return sum(indices.numel() * indices.element_size() for indices, _ in self.entries.values())
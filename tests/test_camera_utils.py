@@ -0,0 +1,51 @@
+import os
+import time
+import threading
+import pytest
+
+torch = pytest.importorskip("torch")
+Image = pytest.importorskip("PIL.Image")
+requires_cuda = pytest.mark.skipif(not torch.cuda.is_available(), reason="cameras are attached to a CameraBank on the GPU")
+
+import numpy as np
+from argparse import Namespace
+from scene.dataset_readers import CameraInfo
+from utils.camera_utils import cameraList_from_camInfos, _load_ordered
+
+def make_cam_infos(directory, count):
+    cam_infos = []
+    for idx in range(count):
+        path = os.path.join(directory, "{:03d}.png".format(idx))
+        Image.fromarray(np.full((24, 32, 3), idx, dtype=np.uint8)).save(path)
+        cam_infos.append(CameraInfo(uid=idx, R=np.eye(3), T=np.array([0.0, 0.0, float(idx)]), FovY=1.0, FovX=1.2,
+                                    depth_params=None, image_path=path, image_name="{:03d}".format(idx), depth_path="",
+                                    width=32, height=24, is_test=False))
+    return cam_infos
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_pooled_load_keeps_order(workers):
+    threads = set()
+
+    def load(item):
+        idx, info = item
+        threads.add(threading.current_thread().name)
+        # Later items finish first, the result must still follow the input order
+        time.sleep(0.01 * (8 - idx))
+        return (idx, info)
+
+    infos = ["view{}".format(idx) for idx in range(8)]
+    assert _load_ordered(load, infos, Namespace(camera_load_workers=workers)) == list(enumerate(infos))
+    assert all(name.startswith("camera_loader") for name in threads)
+
+@requires_cuda
+@pytest.mark.parametrize("workers", [0, 1, 4])
+def test_camera_list_keeps_order(tmp_path, workers):
+    cam_infos = make_cam_infos(str(tmp_path), 6)
+    args = Namespace(resolution=-1, train_test_exp=False, data_device="cuda", camera_load_workers=workers)
+    cameras = cameraList_from_camInfos(cam_infos, 1.0, args, False, False)
+
+    assert [camera.image_name for camera in cameras] == [info.image_name for info in cam_infos]
+    for idx, camera in enumerate(cameras):
+        assert camera.uid == idx
+        assert (camera.image_width, camera.image_height) == (32, 24)
+        assert torch.allclose(camera.original_image, torch.full_like(camera.original_image, idx / 255.0))
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from utils.checkpoint_utils import CheckpointWriter
+
+def failing_write():
+    raise OSError("disk full")
+
+def test_finished_failures_are_reported(tmp_path):
+    writer = CheckpointWriter(str(tmp_path))
+    writer.pending.append(writer.executor.submit(failing_write))
+    writer.pending[0].exception()
+    with pytest.raises(OSError):
+        writer._reap()
+    assert writer.pending == []
+
+def test_wait_reraises_and_clears(tmp_path):
+    writer = CheckpointWriter(str(tmp_path))
+    writer.pending.append(writer.executor.submit(failing_write))
+    writer.pending.append(writer.executor.submit(lambda: None))
+    with pytest.raises(OSError):
+        writer.wait()
+    writer.wait()
+    assert writer.pending == []
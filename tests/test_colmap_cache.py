@@ -0,0 +1,34 @@
+import os
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+import numpy as np
+from scene.colmap_cache import read_colmap_model, CACHE_DIR
+
+def write_model(sparse_dir, tx):
+    with open(os.path.join(sparse_dir, "cameras.txt"), "w") as f:
+        f.write("# Camera list\n1 PINHOLE 640 480 500 500 320 240\n")
+    with open(os.path.join(sparse_dir, "images.txt"), "w") as f:
+        f.write("# Image list\n")
+        f.write("1 1 0 0 0 {} 0 0 1 a.png\n10 20 -1\n".format(tx))
+        f.write("2 1 0 0 0 0 1 0 1 b.png\n\n")
+
+def test_rebuild_replaces_columns_under_open_maps(tmp_path):
+    sparse_dir = str(tmp_path)
+    write_model(sparse_dir, 0.5)
+    _, _, columns = read_colmap_model(sparse_dir)
+    tvecs = columns["image_tvecs"]
+    tvecs_path = os.path.join(sparse_dir, CACHE_DIR, "image_tvecs.npy")
+    inode = os.stat(tvecs_path).st_ino
+
+    # A changed source rebuilds the cache; the map held above must keep its data
+    write_model(sparse_dir, 2.5)
+    os.utime(os.path.join(sparse_dir, "images.txt"), ns=(0, 0))
+    _, _, rebuilt = read_colmap_model(sparse_dir)
+
+    assert os.stat(tvecs_path).st_ino != inode
+    assert np.allclose(tvecs[0], [0.5, 0, 0])
+    assert np.allclose(rebuilt["image_tvecs"][0], [2.5, 0, 0])
+    assert not [name for name in os.listdir(os.path.join(sparse_dir, CACHE_DIR)) if name.endswith(".tmp")]
@@ -0,0 +1,36 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+if not torch.cuda.is_available():
+    pytest.skip("the validation ground truth is kept on the GPU", allow_module_level=True)
+
+from types import SimpleNamespace
+from utils.convergence_monitor import ConvergenceMonitor
+
+class FakeScene:
+    def __init__(self, train_count, test_count):
+        self.train = [SimpleNamespace(original_image=torch.zeros((3, 4, 4))) for _ in range(train_count)]
+        self.test = [SimpleNamespace(original_image=torch.zeros((3, 4, 4))) for _ in range(test_count)]
+
+    def getTrainCameras(self):
+        return self.train
+
+    def getTestCameras(self):
+        return self.test
+
+def test_validation_views_are_held_out_training_views():
+    scene = FakeScene(40, 5)
+    monitor = ConvergenceMonitor(scene, num_views=8)
+    held_out = set(id(camera) for camera in monitor.cameras)
+    training = monitor.training_cameras(scene.getTrainCameras())
+
+    assert len(monitor.cameras) == 4
+    assert held_out <= set(id(camera) for camera in scene.train)
+    assert not held_out & set(id(camera) for camera in scene.test)
+    assert len(training) == 36 and not held_out & set(id(camera) for camera in training)
+
+def test_small_scenes_keep_every_view_for_training():
+    scene = FakeScene(9, 0)
+    monitor = ConvergenceMonitor(scene, num_views=8)
+    assert monitor.cameras == []
+    assert monitor.training_cameras(scene.getTrainCameras()) == scene.train
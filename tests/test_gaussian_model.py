@@ -0,0 +1,64 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("PIL")
+if not torch.cuda.is_available():
+    pytest.skip("GaussianModel keeps its state on the GPU", allow_module_level=True)
+
+from torch import nn
+from scene.gaussian_model import GaussianModel
+
+def make_model(count):
+    gaussians = GaussianModel(0)
+    xyz = torch.rand((count, 3), device="cuda")
+    gaussians._xyz = nn.Parameter(xyz.clone().requires_grad_(True))
+    gaussians._xyz_initial = xyz.clone()
+    gaussians._features_dc = nn.Parameter(torch.rand((count, 1, 3), device="cuda").requires_grad_(True))
+    gaussians._features_rest = nn.Parameter(torch.zeros((count, 0, 3), device="cuda").requires_grad_(True))
+    gaussians._opacity = nn.Parameter(torch.rand((count, 1), device="cuda").requires_grad_(True))
+    gaussians._scaling = nn.Parameter(torch.rand((count, 3), device="cuda").requires_grad_(True))
+    gaussians._rotation = nn.Parameter(torch.rand((count, 4), device="cuda").requires_grad_(True))
+    gaussians.max_radii2D = torch.zeros(count, device="cuda")
+    gaussians.xyz_gradient_accum = torch.zeros((count, 1), device="cuda")
+    gaussians.denom = torch.zeros((count, 1), device="cuda")
+    gaussians.optimizer = torch.optim.Adam([
+        {'params': [gaussians._xyz], "name": "xyz"},
+        {'params': [gaussians._features_dc], "name": "f_dc"},
+        {'params': [gaussians._features_rest], "name": "f_rest"},
+        {'params': [gaussians._opacity], "name": "opacity"},
+        {'params': [gaussians._scaling], "name": "scaling"},
+        {'params': [gaussians._rotation], "name": "rotation"}
+    ], lr=0.0, eps=1e-15)
+    return gaussians
+
+def test_prune_then_reorder_keeps_xyz_initial_aligned():
+    gaussians = make_model(1000)
+    mask = torch.zeros(1000, dtype=torch.bool, device="cuda")
+    mask[::3] = True
+    gaussians.prune_points(mask)
+    assert gaussians._xyz_initial.shape[0] == gaussians.get_xyz.shape[0] == 1000 - int(mask.sum())
+
+    gaussians.reorder_morton()
+    # The positions were never optimized, so each row must still match its initial position
+    assert torch.equal(gaussians._xyz_initial, gaussians.get_xyz.detach())
+
+def test_reorder_rejects_misaligned_xyz_initial():
+    gaussians = make_model(100)
+    gaussians._xyz_initial = gaussians._xyz_initial[:50]
+    with pytest.raises(RuntimeError):
+        gaussians.reorder_morton()
+
+def accumulate(gaussians, batch_size, weights):
+    visible = torch.ones(gaussians.get_xyz.shape[0], dtype=torch.bool, device="cuda")
+    for view_weights in weights:
+        viewspace = torch.zeros_like(view_weights, requires_grad=True)
+        ((viewspace * view_weights).sum() / batch_size).backward()
+        gaussians.add_densification_stats(viewspace, visible, batch_size)
+    return gaussians.xyz_gradient_accum.clone(), gaussians.denom.clone()
+
+def test_batched_densification_stats_match_single_view_steps():
+    weights = [torch.rand((100, 3), device="cuda") for _ in range(4)]
+    single = accumulate(make_model(100), 1, weights)
+    batched = accumulate(make_model(100), len(weights), weights)
+    assert torch.allclose(batched[0], single[0])
+    assert torch.equal(batched[1], single[1])
@@ -0,0 +1,40 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("PIL")
+if not torch.cuda.is_available():
+    pytest.skip("load_ply builds the parameters on the GPU", allow_module_level=True)
+
+import numpy as np
+from scene.gaussian_model import GaussianModel
+from utils.ply_utils import write_ply_binary
+
+def write_model(path, count, sh_degree):
+    num_rest = 3 * (sh_degree + 1) ** 2 - 3
+    names = ["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"] + ["f_rest_{}".format(i) for i in range(num_rest)]
+    names += ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    attributes = np.random.rand(count, len(names)).astype(np.float32)
+    write_ply_binary(str(path), names, attributes)
+    return names, attributes
+
+def test_full_load_with_sh_degree_0(tmp_path):
+    names, attributes = write_model(tmp_path / "model.ply", 10, 0)
+    gaussians = GaussianModel(0)
+    gaussians.load_ply(str(tmp_path / "model.ply"))
+    assert gaussians._features_rest.shape == (10, 0, 3)
+    assert np.allclose(gaussians.get_xyz.detach().cpu().numpy(), attributes[:, :3])
+
+def test_partial_load_resets_skipped_attributes(tmp_path):
+    write_model(tmp_path / "big.ply", 20, 1)
+    names, attributes = write_model(tmp_path / "small.ply", 8, 1)
+    gaussians = GaussianModel(1)
+    gaussians.load_ply(str(tmp_path / "big.ply"))
+
+    gaussians.load_ply(str(tmp_path / "small.ply"), attributes=("xyz", "opacity"), rows=slice(2, 6))
+    assert np.allclose(gaussians._xyz.detach().cpu().numpy(), attributes[2:6, :3])
+    assert np.allclose(gaussians._opacity.detach().cpu().numpy()[:, 0], attributes[2:6, names.index("opacity")])
+    assert gaussians._features_dc.shape == (4, 0, 3)
+    assert gaussians._scaling.shape == (4, 0)
+    assert gaussians._rotation.shape == (4, 0)
+    assert gaussians._features_rest.shape == (4, 3, 3)
+    assert not gaussians._features_rest.detach().any()
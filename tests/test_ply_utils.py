@@ -0,0 +1,52 @@
+import os
+import threading
+import pytest
+import numpy as np
+from utils import ply_utils
+
+class HostSnapshot:
+    def __init__(self, array):
+        self.array = array
+
+    def numpy(self):
+        return self.array
+
+class GatedCopy:
+    """ Stands in for the CUDA event: the write waits until the gate opens. """
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    def synchronize(self):
+        if self.gate is not None:
+            self.gate.wait()
+
+def submit(path, gate=None):
+    ply_utils.reserve_ply_write_slot()
+    return ply_utils.submit_ply_write(str(path), ["x", "y"], HostSnapshot(np.zeros((4, 2), dtype=np.float32)), GatedCopy(gate))
+
+def test_in_flight_writes_are_bounded(tmp_path):
+    gate = threading.Event()
+    for idx in range(ply_utils.MAX_PENDING_PLY_WRITES):
+        submit(tmp_path / "{}.ply".format(idx), gate)
+    assert len(ply_utils._pending) == ply_utils.MAX_PENDING_PLY_WRITES
+
+    # The next reservation blocks on the oldest write until it is released
+    reserved = threading.Event()
+    waiter = threading.Thread(target=lambda: (ply_utils.reserve_ply_write_slot(), reserved.set()))
+    waiter.start()
+    assert not reserved.wait(0.2)
+    gate.set()
+    waiter.join(5)
+    assert reserved.is_set()
+    ply_utils.wait_for_ply_writes()
+    assert sorted(os.listdir(tmp_path)) == ["0.ply", "1.ply"]
+
+def test_failed_write_is_reported(tmp_path):
+    submit(tmp_path / "missing" / "point_cloud.ply").exception(5)
+    with pytest.raises(OSError):
+        ply_utils.reserve_ply_write_slot()
+    assert not ply_utils._pending
+
+    submit(tmp_path / "missing" / "point_cloud.ply")
+    with pytest.raises(OSError):
+        ply_utils.wait_for_ply_writes()
@@ -0,0 +1,24 @@
+import os
+import pytest
+
+pytest.importorskip("PIL")
+
+import numpy as np
+from utils.preprocess_cache import cached_array
+
+def test_entry_is_cached_without_leftover_files(tmp_path):
+    source = tmp_path / "image.png"
+    source.write_bytes(b"not decoded")
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return np.arange(12, dtype=np.uint8).reshape(3, 4)
+
+    first = cached_array(str(source), (4, 3), cache_dir, produce)
+    second = cached_array(str(source), (4, 3), cache_dir, produce)
+
+    assert len(calls) == 1
+    assert np.array_equal(first, second)
+    assert [os.path.splitext(name)[1] for name in os.listdir(cache_dir)] == [".npy"]
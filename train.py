@@ -1,24 +1,27 @@
 # train.py
 
+import time
+_import_start = time.perf_counter()
 import os
 import torch
-from random import randint
 from utils.loss_utils import l1_loss, ssim
 from gaussian_renderer import render, network_gui
 import sys
 from scene import Scene, GaussianModel
-from utils.general_utils import safe_state, get_expon_lr_func
+from scene.visibility_cache import VisibilityCache
+from scene.camera_prefetcher import CameraPrefetcher
+from scene.camera_sampler import make_camera_sampler
+from utils.general_utils import safe_state, get_expon_lr_func, compress_lr_func
 import uuid
 from tqdm import tqdm
 from utils.image_utils import psnr
+from utils.ply_utils import wait_for_ply_writes
+from utils.metric_buffer import MetricBuffer
+from utils.stage_profiler import StageProfiler
+from utils.convergence_monitor import ConvergenceMonitor
+from utils.checkpoint_utils import CheckpointWriter, load_checkpoint, is_native_checkpoint
 from argparse import ArgumentParser, Namespace
-from arguments import ModelParams, PipelineParams, OptimizationParams, DenoiseParams
-try:
-    from torch.utils.tensorboard import SummaryWriter
-    TENSORBOARD_FOUND = True
-except ImportError:
-    TENSORBOARD_FOUND = False
-
+from arguments import ModelParams, PipelineParams, OptimizationParams, DenoiseParams, CheckpointParams
 try:
     from fused_ssim import fused_ssim
     FUSED_SSIM_AVAILABLE = True
@@ -30,165 +33,306 @@ try:
     SPARSE_ADAM_AVAILABLE = True
 except:
     SPARSE_ADAM_AVAILABLE = False
-
-def training(dataset, opt, pipe, testing_iterations, saving_iterations, checkpoint_iterations, checkpoint, debug_from, denoise):
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+def print_startup_profile(timings):
+    total = sum(timings.values())
+    print("\nStartup profile")
+    for phase, seconds in timings.items():
+        print("  {:<22}{:>8.2f} s {:>6.1f}%".format(phase, seconds, 100.0 * seconds / max(total, 1e-9)))
+    print("  {:<22}{:>8.2f} s".format("total", total))
+
+# Iteration counts of OptimizationParams that are rescaled to optimizer steps when several views share a step
+BATCH_SCALED_SCHEDULES = ("iterations", "position_lr_max_steps", "densification_interval", "opacity_reset_interval", "densify_from_iter",
+                          "densify_until_iter", "visibility_refresh_interval", "morton_reorder_interval", "convergence_interval",
+                          "convergence_anneal_iters")
+
+def scale_schedules_for_batch(opt, iteration_lists):
+    """
+    With batch_size views per optimizer step, the iteration-based schedules of opt
+    and the test / save / checkpoint iterations are divided by the batch size, so
+    that each happens after the same number of rendered views as in an unbatched run.
+    Returns the rescaled lists.
+    """
+    batch_size = opt.batch_size
+    for name in BATCH_SCALED_SCHEDULES:
+        value = getattr(opt, name)
+        if value > 0:
+            setattr(opt, name, max(1, value // batch_size))
+    print("Batch of {} views per step: training for {} steps".format(batch_size, opt.iterations))
+    return [sorted(set(max(1, i // batch_size) for i in iterations)) for iterations in iteration_lists]
+
+def training(dataset, opt, pipe, testing_iterations, saving_iterations, checkpoint_iterations, checkpoint, debug_from, denoise, ckpt, startup_timings=None, metrics_flush_interval=50, profile_stages=False):
     if not SPARSE_ADAM_AVAILABLE and opt.optimizer_type == "sparse_adam":
         sys.exit(f"Trying to use sparse adam but it is not installed, please install the correct rasterizer using pip install [3dgs_accel].")
+    if opt.batch_size > 1:
+        testing_iterations, saving_iterations, checkpoint_iterations = scale_schedules_for_batch(opt, (testing_iterations, saving_iterations, checkpoint_iterations))
+    sh_up_interval, sh_up_from = max(1, 1000 // opt.batch_size), 15000 // opt.batch_size
     first_iter = 0
     tb_writer = prepare_output_and_logger(dataset)
     gaussians = GaussianModel(dataset.sh_degree, denoise.apply_dbscan)
     scene = Scene(dataset, gaussians, denoise)
+    setup_start = time.perf_counter()
     gaussians.training_setup(opt)
     if checkpoint:
-        (model_params, first_iter) = torch.load(checkpoint)
+        if is_native_checkpoint(checkpoint):
+            (model_params, first_iter) = load_checkpoint(checkpoint)
+        else:
+            (model_params, first_iter) = torch.load(checkpoint)
         gaussians.restore(model_params, opt)
+    if startup_timings is not None:
+        startup_timings.update(scene.load_timings)
+        startup_timings["model init"] += time.perf_counter() - setup_start
+        print_startup_profile(startup_timings)
 
     bg_color = [1, 1, 1] if dataset.white_background else [0, 0, 0]
     background = torch.tensor(bg_color, dtype=torch.float32, device="cuda")
 
-    iter_start = torch.cuda.Event(enable_timing = True)
-    iter_end = torch.cuda.Event(enable_timing = True)
+    checkpoint_writer = None
+    if ckpt.checkpoint_format == "native":
+        checkpoint_writer = CheckpointWriter(scene.model_path, max_in_flight=ckpt.checkpoint_max_in_flight, full_every=ckpt.checkpoint_full_every,
+                                             keep_last=ckpt.checkpoint_keep_last, keep_every=ckpt.checkpoint_keep_every, blocking=not ckpt.checkpoint_async)
 
     use_sparse_adam = opt.optimizer_type == "sparse_adam" and SPARSE_ADAM_AVAILABLE
+    visibility_cache = VisibilityCache(opt.visibility_refresh_interval) if opt.sparse_visibility_updates else None
     depth_l1_weight = get_expon_lr_func(opt.depth_l1_weight_init, opt.depth_l1_weight_final, max_steps=opt.iterations)
 
-    viewpoint_stack = None
-    viewpoint_indices = list(range(0))
-    ema_loss_for_log = 0.0
-    ema_Ll1depth_for_log = 0.0
+    train_cameras = scene.getTrainCameras()
+    convergence = None
+    if opt.convergence_interval > 0:
+        convergence = ConvergenceMonitor(scene, opt.convergence_views, opt.convergence_interval, opt.convergence_min_gain,
+                                         opt.convergence_patience, opt.batch_size)
+        # The validation views are held out of training
+        train_cameras = convergence.training_cameras(train_cameras)
+    camera_sampler = make_camera_sampler(train_cameras, opt)
+    camera_prefetcher = CameraPrefetcher(train_cameras, dataset.prefetch_cameras, camera_sampler)
+
+    # Wall-clock training time, without the evaluations, for the target PSNR report
+    train_start = time.perf_counter()
+    eval_seconds = 0.0
+    target_reached = opt.target_psnr <= 0
 
     progress_bar = tqdm(range(first_iter, opt.iterations), desc="Training progress")
+    # Scalars stay on the device and are logged in bulk, the loop itself does not wait for the GPU
+    metrics = MetricBuffer(tb_writer, progress_bar, metrics_flush_interval)
+    profiler = StageProfiler(profile_stages)
     first_iter += 1
     for iteration in range(first_iter, opt.iterations + 1):
-        if network_gui.conn == None:
-            network_gui.try_connect()
-        while network_gui.conn != None:
-            try:
-                net_image_bytes = None
-                custom_cam, do_training, pipe.convert_SHs_python, pipe.compute_cov3D_python, keep_alive, scaling_modifer = network_gui.receive()
-                if custom_cam != None:
-                    net_image = render(custom_cam, gaussians, pipe, background, scaling_modifier=scaling_modifer, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)["render"]
-                    net_image_bytes = memoryview((torch.clamp(net_image, min=0, max=1.0) * 255).byte().permute(1, 2, 0).contiguous().cpu().numpy())
-                network_gui.send(net_image_bytes, dataset.source_path)
-                if do_training and ((iteration < int(opt.iterations)) or not keep_alive):
-                    break
-            except Exception as e:
-                network_gui.conn = None
-
+        # The convergence monitor may have moved the end of training forward
+        if iteration > opt.iterations:
+            break
+        with profiler.scope("network_gui"):
+            if network_gui.conn == None:
+                network_gui.try_connect()
+            while network_gui.conn != None:
+                try:
+                    net_image_bytes = None
+                    custom_cam, do_training, pipe.convert_SHs_python, pipe.compute_cov3D_python, keep_alive, scaling_modifer = network_gui.receive()
+                    if custom_cam != None:
+                        net_image = render(custom_cam, gaussians, pipe, background, scaling_modifier=scaling_modifer, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)["render"]
+                        net_image_bytes = memoryview((torch.clamp(net_image, min=0, max=1.0) * 255).byte().permute(1, 2, 0).contiguous().cpu().numpy())
+                    network_gui.send(net_image_bytes, dataset.source_path)
+                    if do_training and ((iteration < int(opt.iterations)) or not keep_alive):
+                        break
+                except Exception as e:
+                    network_gui.conn = None
+
+        # Fresh events per iteration, they are read when the metric buffer is flushed
+        iter_start = torch.cuda.Event(enable_timing = True)
+        iter_end = torch.cuda.Event(enable_timing = True)
         iter_start.record()
 
         gaussians.update_learning_rate(iteration)
 
-        # Every 1000 its we increase the levels of SH up to a maximum degree
-        if iteration % 1000 == 0 and iteration > 15000:
+        # Every 1000 views we increase the levels of SH up to a maximum degree
+        if iteration % sh_up_interval == 0 and iteration > sh_up_from:
             gaussians.oneupSHdegree()
 
-        # Pick a random Camera
-        if not viewpoint_stack:
-            viewpoint_stack = scene.getTrainCameras().copy()
-            viewpoint_indices = list(range(len(viewpoint_stack)))
-        rand_idx = randint(0, len(viewpoint_indices) - 1)
-        viewpoint_cam = viewpoint_stack.pop(rand_idx)
-        vind = viewpoint_indices.pop(rand_idx)
-
-        # Render
+        # Render the batch of views, gradients accumulate over their (batch-averaged) losses
         if (iteration - 1) == debug_from:
             pipe.debug = True
 
-        bg = torch.rand((3), device="cuda") if opt.random_background else background
-
-        render_pkg = render(viewpoint_cam, gaussians, pipe, bg, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE)
-        image, viewspace_point_tensor, visibility_filter, radii = render_pkg["render"], render_pkg["viewspace_points"], render_pkg["visibility_filter"], render_pkg["radii"]
-
-        if viewpoint_cam.alpha_mask is not None:
-            alpha_mask = viewpoint_cam.alpha_mask.cuda()
-            image *= alpha_mask
-
-        # Loss
-        gt_image = viewpoint_cam.original_image.cuda()
-        Ll1 = l1_loss(image, gt_image)
-        if FUSED_SSIM_AVAILABLE:
-            ssim_value = fused_ssim(image.unsqueeze(0), gt_image.unsqueeze(0))
-        else:
-            ssim_value = ssim(image, gt_image)
-
-        loss = (1.0 - opt.lambda_dssim) * Ll1 + opt.lambda_dssim * (1.0 - ssim_value)
-
-        # Depth regularization
-        Ll1depth_pure = 0.0
-        if depth_l1_weight(iteration) > 0 and viewpoint_cam.depth_reliable:
-            invDepth = render_pkg["depth"]
-            mono_invdepth = viewpoint_cam.invdepthmap.cuda()
-            depth_mask = viewpoint_cam.depth_mask.cuda()
-
-            Ll1depth_pure = torch.abs((invDepth  - mono_invdepth) * depth_mask).mean()
-            Ll1depth = depth_l1_weight(iteration) * Ll1depth_pure 
-            loss += Ll1depth
-            Ll1depth = Ll1depth.item()
-        else:
-            Ll1depth = 0
-
-         #regularization 
-        if opt.apply_regularization:
-            if gaussians.cluster_centers is not None and gaussians.cluster_centers.numel() > 0 and denoise.apply_dbscan:
-                # L2 regularization (using gaussians.cluster_centers, gaussians._xyz, and opt.regularization_weight)
-                distances_to_clusters = torch.cdist(gaussians._xyz, gaussians.cluster_centers, p=2)  # Shape: [num_points, num_clusters]
-                min_distances, _ = torch.min(distances_to_clusters, dim=1) #shape : [num_points]
-                L_reg = opt.regularization_weight * torch.mean(min_distances ** 2)  # Add regularization to total loss
-                loss += L_reg
-        loss.backward()
+        batch_Ll1 = 0.0
+        batch_loss = 0.0
+        Ll1depth = 0
+        batch_radii = None
+        batch_views = []
+        for view_index in range(opt.batch_size):
+            # Pick a random Camera
+            with profiler.scope("fetch_view"):
+                training_view = camera_prefetcher.next()
+            viewpoint_cam = training_view.camera
+
+            bg = torch.rand((3), device="cuda") if opt.random_background else background
+
+            with profiler.scope("render"):
+                cached_indices = visibility_cache.get(viewpoint_cam, gaussians, iteration) if visibility_cache is not None else None
+                # The visibility filter syncs with the GPU, it is only needed while densification statistics are collected
+                render_pkg = render(viewpoint_cam, gaussians, pipe, bg, use_trained_exp=dataset.train_test_exp, separate_sh=SPARSE_ADAM_AVAILABLE, visible_indices=cached_indices,
+                                    return_visibility_filter=iteration < opt.densify_until_iter)
+                image, viewspace_point_tensor, visibility_filter, radii = render_pkg["render"], render_pkg["viewspace_points"], render_pkg["visibility_filter"], render_pkg["radii"]
+                if visibility_cache is not None and cached_indices is None:
+                    visibility_cache.update(viewpoint_cam, gaussians, radii, iteration)
+
+            if training_view.alpha_mask is not None:
+                image *= training_view.alpha_mask
+
+            # Loss
+            with profiler.scope("loss"):
+                gt_image = training_view.original_image
+                Ll1 = l1_loss(image, gt_image)
+                if FUSED_SSIM_AVAILABLE:
+                    ssim_value = fused_ssim(image.unsqueeze(0), gt_image.unsqueeze(0))
+                else:
+                    ssim_value = ssim(image, gt_image)
+
+                loss = (1.0 - opt.lambda_dssim) * Ll1 + opt.lambda_dssim * (1.0 - ssim_value)
+                camera_sampler.update(viewpoint_cam, loss)
+
+            # Depth regularization
+            Ll1depth_pure = 0.0
+            if depth_l1_weight(iteration) > 0 and viewpoint_cam.depth_reliable:
+                invDepth = render_pkg["depth"]
+                mono_invdepth = training_view.invdepthmap.float()
+
+                Ll1depth_pure = torch.abs(invDepth  - mono_invdepth).mean()
+                Ll1depth_view = depth_l1_weight(iteration) * Ll1depth_pure
+                loss += Ll1depth_view
+                Ll1depth += Ll1depth_view.detach() / opt.batch_size
+
+             #regularization (once per step, with the last view). It keeps its weight against the batch-mean
+             # image loss, but over a run it is applied once per batch_size rendered views rather than every view
+            if opt.apply_regularization and view_index == opt.batch_size - 1:
+                with profiler.scope("regularization"):
+                    if gaussians.cluster_centers is not None and gaussians.cluster_centers.numel() > 0 and denoise.apply_dbscan:
+                        # L2 regularization (using gaussians.cluster_centers, gaussians._xyz, and opt.regularization_weight)
+                        distances_to_clusters = torch.cdist(gaussians._xyz, gaussians.cluster_centers, p=2)  # Shape: [num_points, num_clusters]
+                        min_distances, _ = torch.min(distances_to_clusters, dim=1) #shape : [num_points]
+                        L_reg = opt.regularization_weight * torch.mean(min_distances ** 2)  # Add regularization to total loss
+                        loss += L_reg * opt.batch_size
+            with profiler.scope("backward"):
+                (loss / opt.batch_size).backward()
+
+            batch_Ll1 += Ll1.detach() / opt.batch_size
+            batch_loss += loss.detach() / opt.batch_size
+            batch_radii = radii if batch_radii is None else torch.max(batch_radii, radii)
+            batch_views.append((viewpoint_cam, viewspace_point_tensor, visibility_filter, radii))
+        Ll1, loss, radii = batch_Ll1, batch_loss, batch_radii
 
         iter_end.record()
 
         with torch.no_grad():
-            # Progress bar
-            ema_loss_for_log = 0.4 * loss.item() + 0.6 * ema_loss_for_log
-            ema_Ll1depth_for_log = 0.4 * Ll1depth + 0.6 * ema_Ll1depth_for_log
-
-            if iteration % 10 == 0:
-                progress_bar.set_postfix({"Loss": f"{ema_loss_for_log:.{7}f}", "Depth Loss": f"{ema_Ll1depth_for_log:.{7}f}"})
-                progress_bar.update(10)
-            if iteration == opt.iterations:
-                progress_bar.close()
+            # Progress bar and losses
+            with profiler.scope("metrics"):
+                metrics.record(iteration, Ll1, loss, Ll1depth, iter_start, iter_end)
 
             # Log and save
-            training_report(tb_writer, iteration, Ll1, loss, l1_loss, iter_start.elapsed_time(iter_end), testing_iterations, scene, render, (pipe, background, 1., SPARSE_ADAM_AVAILABLE, None, dataset.train_test_exp), dataset.train_test_exp, opt.apply_regularization)
+            eval_start = time.perf_counter()
+            with profiler.scope("report"):
+                psnr_reports = training_report(tb_writer, iteration, l1_loss, testing_iterations, scene, render, (pipe, background, 1., SPARSE_ADAM_AVAILABLE, None, dataset.train_test_exp), dataset.train_test_exp, opt.apply_regularization)
+            if psnr_reports:
+                eval_seconds += time.perf_counter() - eval_start
+                reached_psnr = psnr_reports.get("test", psnr_reports.get("train"))
+                if not target_reached and reached_psnr is not None and reached_psnr >= opt.target_psnr:
+                    target_reached = True
+                    print("\n[ITER {}] Reached PSNR {:.2f} (target {}) after {:.1f} s of training, {} views".format(
+                        iteration, reached_psnr, opt.target_psnr, time.perf_counter() - train_start - eval_seconds, iteration * opt.batch_size))
             if (iteration in saving_iterations):
                 print("\n[ITER {}] Saving Gaussians".format(iteration))
-                scene.save(iteration)
+                with profiler.scope("save"):
+                    scene.save(iteration, async_write=True, morton_order=opt.morton_reorder_on_save)
 
             # Densification
             if iteration < opt.densify_until_iter:
-                # Keep track of max radii in image-space for pruning
-                gaussians.max_radii2D[visibility_filter] = torch.max(gaussians.max_radii2D[visibility_filter], radii[visibility_filter])
-                gaussians.add_densification_stats(viewspace_point_tensor, visibility_filter)
+                # Keep track of max radii in image-space for pruning; every view counts as in an unbatched run,
+                # so its viewspace gradient is scaled back from loss / batch_size to the densify_grad_threshold scale
+                with profiler.scope("densification_stats"):
+                    for _, viewspace_point_tensor, visibility_filter, view_radii in batch_views:
+                        gaussians.max_radii2D[visibility_filter] = torch.max(gaussians.max_radii2D[visibility_filter], view_radii[visibility_filter])
+                        gaussians.add_densification_stats(viewspace_point_tensor, visibility_filter, opt.batch_size)
 
                 if iteration > opt.densify_from_iter and iteration % opt.densification_interval == 0:
                     size_threshold = 20 if iteration > opt.opacity_reset_interval else None
-                    gaussians.densify_and_prune(opt.densify_grad_threshold, 0.005, scene.cameras_extent, size_threshold, radii)
+                    with profiler.scope("densify_and_prune"):
+                        gaussians.densify_and_prune(opt.densify_grad_threshold, 0.005, scene.cameras_extent, size_threshold, radii)
                 
                 if iteration % opt.opacity_reset_interval == 0 or (dataset.white_background and iteration == opt.densify_from_iter):
-                    gaussians.reset_opacity()
+                    with profiler.scope("reset_opacity"):
+                        gaussians.reset_opacity()
 
             if gaussians.cluster_centers is not None and gaussians.cluster_centers.numel() > 0 and denoise.apply_dbscan:
-                gaussians.prune_isolated_points(denoise.distance_threshold)
-
+                with profiler.scope("prune_isolated_points"):
+                    gaussians.prune_isolated_points(denoise.distance_threshold)
+
+            # Like densification, this replaces the parameters, so this iteration's step is skipped
+            if opt.morton_reorder_interval > 0 and iteration % opt.morton_reorder_interval == 0:
+                with profiler.scope("reorder_morton"):
+                    gaussians.reorder_morton()
+
+
+            # Convergence: the first plateau ends densification, the next one anneals the learning rates and stops
+            if convergence is not None and iteration > opt.densify_from_iter:
+                with profiler.scope("convergence"):
+                    state = convergence.evaluate(iteration, gaussians, render, (pipe, background, 1., SPARSE_ADAM_AVAILABLE, None, dataset.train_test_exp), dataset.train_test_exp)
+                if state == "plateau" and iteration < opt.densify_until_iter:
+                    print("\n[ITER {}] Validation PSNR plateaued at {:.2f}, ending densification".format(iteration, convergence.best_psnr))
+                    opt.densify_until_iter = iteration
+                    convergence.reset()
+                elif state == "plateau" and not opt.convergence_densify_only and iteration + opt.convergence_anneal_iters < opt.iterations:
+                    end_iteration = iteration + opt.convergence_anneal_iters
+                    print("\n[ITER {}] Validation PSNR plateaued at {:.2f}, annealing and stopping at iteration {}".format(iteration, convergence.best_psnr, end_iteration))
+                    gaussians.shorten_schedule(iteration, end_iteration, opt)
+                    depth_l1_weight = compress_lr_func(depth_l1_weight, opt.depth_l1_weight_final, iteration, end_iteration)
+                    opt.iterations = end_iteration
+                    saving_iterations.append(end_iteration)
+                    testing_iterations.append(end_iteration)
+                    progress_bar.total = end_iteration - first_iter + 1
+                    convergence = None
+                # With convergence_densify_only there is nothing left to decide once densification is over
+                if convergence is not None and opt.convergence_densify_only and iteration >= opt.densify_until_iter:
+                    convergence = None
 
             # Optimizer step
             if iteration < opt.iterations:
-                gaussians.exposure_optimizer.step()
-                gaussians.exposure_optimizer.zero_grad(set_to_none = True)
-                if use_sparse_adam:
-                    visible = radii > 0
-                    gaussians.optimizer.step(visible, radii.shape[0])
-                    gaussians.optimizer.zero_grad(set_to_none = True)
-                else:
-                    gaussians.optimizer.step()
-                    gaussians.optimizer.zero_grad(set_to_none = True)
+                with profiler.scope("optimizer"):
+                    step_indices = None
+                    if visibility_cache is not None:
+                        cached = [visibility_cache.get(view[0], gaussians, iteration) for view in batch_views]
+                        if all(indices is not None for indices in cached):
+                            step_indices = cached[0] if len(cached) == 1 else torch.unique(torch.cat(cached))
+                    gaussians.exposure_optimizer.step()
+                    gaussians.exposure_optimizer.zero_grad(set_to_none = True)
+                    if use_sparse_adam:
+                        visible = radii > 0
+                        gaussians.optimizer.step(visible, radii.shape[0])
+                        gaussians.optimizer.zero_grad(set_to_none = True)
+                    elif step_indices is not None:
+                        # Only the Gaussians cached for this view receive an update
+                        gaussians.sparse_optimizer_step(step_indices)
+                        gaussians.optimizer.zero_grad(set_to_none = True)
+                    else:
+                        gaussians.optimizer.step()
+                        gaussians.optimizer.zero_grad(set_to_none = True)
 
             if (iteration in checkpoint_iterations):
                 print("\n[ITER {}] Saving Checkpoint".format(iteration))
-                torch.save((gaussians.capture(), iteration), scene.model_path + "/chkpnt" + str(iteration) + ".pth")
+                with profiler.scope("checkpoint"):
+                    if checkpoint_writer is not None:
+                        checkpoint_writer.submit(gaussians.capture(), iteration)
+                    else:
+                        torch.save((gaussians.capture(), iteration), scene.model_path + "/chkpnt" + str(iteration) + ".pth")
+
+    camera_prefetcher.close()
+    iterations_per_second = metrics.close()
+    if iterations_per_second > 0:
+        print("\nTrained at {:.2f} iterations/s".format(iterations_per_second))
+    if profile_stages:
+        profiler.write_report(scene.model_path)
+
+    # Snapshots are written in the background; make sure they hit the disk
+    wait_for_ply_writes()
+    if checkpoint_writer is not None:
+        checkpoint_writer.wait()
 
 def prepare_output_and_logger(args):    
     if not args.model_path:
@@ -204,20 +348,18 @@ def prepare_output_and_logger(args):
     with open(os.path.join(args.model_path, "cfg_args"), 'w') as cfg_log_f:
         cfg_log_f.write(str(Namespace(**vars(args))))
 
-    # Create Tensorboard writer
+    # Create Tensorboard writer, imported here as it is slow to load
     tb_writer = None
-    if TENSORBOARD_FOUND:
+    try:
+        from torch.utils.tensorboard import SummaryWriter
         tb_writer = SummaryWriter(args.model_path)
-    else:
+    except ImportError:
         print("Tensorboard not available: not logging progress")
     return tb_writer
 
-def training_report(tb_writer, iteration, Ll1, loss, l1_loss, elapsed, testing_iterations, scene : Scene, renderFunc, renderArgs, train_test_exp, apply_regularization):
-    if tb_writer:
-        tb_writer.add_scalar('train_loss_patches/l1_loss', Ll1.item(), iteration)
-        tb_writer.add_scalar('train_loss_patches/total_loss', loss.item(), iteration)
-        tb_writer.add_scalar('iter_time', elapsed, iteration)
-
+def training_report(tb_writer, iteration, l1_loss, testing_iterations, scene : Scene, renderFunc, renderArgs, train_test_exp, apply_regularization):
+    """ At the testing iterations, evaluates and logs; returns the PSNR of each evaluated split. The training losses go through MetricBuffer. """
+    psnr_reports = {}
     # Report test and samples of training set
     if iteration in testing_iterations:
         torch.cuda.empty_cache()
@@ -243,6 +385,7 @@ def training_report(tb_writer, iteration, Ll1, loss, l1_loss, elapsed, testing_i
                 psnr_test /= len(config['cameras'])
                 l1_test /= len(config['cameras'])          
                 print("\n[ITER {}] Evaluating {}: L1 {} PSNR {}".format(iteration, config['name'], l1_test, psnr_test))
+                psnr_reports[config['name']] = psnr_test.item()
                 if tb_writer:
                     tb_writer.add_scalar(config['name'] + '/loss_viewpoint - l1_loss', l1_test, iteration)
                     tb_writer.add_scalar(config['name'] + '/loss_viewpoint - psnr', psnr_test, iteration)
@@ -253,6 +396,7 @@ def training_report(tb_writer, iteration, Ll1, loss, l1_loss, elapsed, testing_i
         torch.cuda.empty_cache()
         if apply_regularization:
             print("L2 Regularization was applied")
+    return psnr_reports
 
 if __name__ == "__main__":
     # Set up command line argument parser
@@ -261,6 +405,7 @@ if __name__ == "__main__":
     op = OptimizationParams(parser)
     pp = PipelineParams(parser)
     denoise_params = DenoiseParams(parser)
+    cp = CheckpointParams(parser)
     parser.add_argument('--ip', type=str, default="127.0.0.1")
     parser.add_argument('--port', type=int, default=6009)
     parser.add_argument('--debug_from', type=int, default=-1)
@@ -271,7 +416,12 @@ if __name__ == "__main__":
     parser.add_argument('--disable_viewer', action='store_true', default=False)
     parser.add_argument("--checkpoint_iterations", nargs="+", type=int, default=[])
     parser.add_argument("--start_checkpoint", type=str, default = None)
+    parser.add_argument("--profile_startup", action="store_true", default=False)
+    parser.add_argument("--metrics_flush_interval", type=int, default=50)
+    parser.add_argument("--profile_stages", action="store_true", default=False)
+    parse_start = time.perf_counter()
     args = parser.parse_args(sys.argv[1:])
+    startup_timings = {"imports": IMPORT_SECONDS, "argument parsing": time.perf_counter() - parse_start} if args.profile_startup else None
     args.save_iterations.append(args.iterations)
     
     print("Optimizing " + args.model_path)
@@ -283,7 +433,7 @@ if __name__ == "__main__":
     if not args.disable_viewer:
         network_gui.init(args.ip, args.port)
     torch.autograd.set_detect_anomaly(args.detect_anomaly)
-    training(lp.extract(args), op.extract(args), pp.extract(args), args.test_iterations, args.save_iterations, args.checkpoint_iterations, args.start_checkpoint, args.debug_from, denoise_params.extract(args))
+    training(lp.extract(args), op.extract(args), pp.extract(args), args.test_iterations, args.save_iterations, args.checkpoint_iterations, args.start_checkpoint, args.debug_from, denoise_params.extract(args), cp.extract(args), startup_timings, args.metrics_flush_interval, args.profile_stages)
 
     # All done
     print("\nTraining complete.")
\ No newline at end of file
@@ -9,36 +9,37 @@
 # For inquiries contact  george.drettakis@inria.fr
 #
 
-from scene.cameras import Camera
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scene.cameras import Camera, load_image_tensors
+from scene.camera_bank import CameraBank
 import numpy as np
+from functools import partial
 from utils.graphics_utils import fov2focal
+from utils.preprocess_cache import resized_image_array, resized_depth_array
 from PIL import Image
-import cv2
 
 WARNED = False
+# Cameras are loaded from a thread pool, the large image warning is printed once
+_warn_lock = threading.Lock()
 
-def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dataset):
-    image = Image.open(cam_info.image_path)
+def load_image_from_path(image_path, resolution, train_test_exp, is_test_dataset, is_test_view, cache_dir="", compact=False):
+    image = resized_image_array(image_path, resolution, cache_dir)
+    return load_image_tensors(image, resolution, train_test_exp, is_test_dataset, is_test_view, compact)
 
-    if cam_info.depth_path != "":
-        try:
-            if is_nerf_synthetic:
-                invdepthmap = cv2.imread(cam_info.depth_path, -1).astype(np.float32) / 512
-            else:
-                invdepthmap = cv2.imread(cam_info.depth_path, -1).astype(np.float32) / float(2**16)
+def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dataset, image_cache=None, decoded=None):
+    # decoded: (PIL image, raw depth map) already read by the pyramid loader, shared across scales
+    image = Image.open(cam_info.image_path) if decoded is None else decoded[0]
+    cache_dir = getattr(args, "preprocessed_cache_dir", "")
+    compact_images = getattr(args, "compact_images", False)
+    shared_store = getattr(args, "shared_image_store", "")
+    if shared_store:
+        # Entries are attached copy-on-write, so host-side (data_device cpu) cameras keep views of the shared
+        # pages until they write to them; cuda cameras copy the image to the device as usual
+        cache_dir = shared_store
+        compact_images = True
 
-        except FileNotFoundError:
-            print(f"Error: The depth file at path '{cam_info.depth_path}' was not found.")
-            raise
-        except IOError:
-            print(f"Error: Unable to open the image file '{cam_info.depth_path}'. It may be corrupted or an unsupported format.")
-            raise
-        except Exception as e:
-            print(f"An unexpected error occurred when trying to read depth at {cam_info.depth_path}: {e}")
-            raise
-    else:
-        invdepthmap = None
-        
     orig_w, orig_h = image.size
     if args.resolution in [1, 2, 4, 8]:
         resolution = round(orig_w/(resolution_scale * args.resolution)), round(orig_h/(resolution_scale * args.resolution))
@@ -46,10 +47,11 @@ def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dat
         if args.resolution == -1:
             if orig_w > 1600:
                 global WARNED
-                if not WARNED:
-                    print("[ INFO ] Encountered quite large input images (>1.6K pixels width), rescaling to 1.6K.\n "
-                        "If this is not desired, please explicitly specify '--resolution/-r' as 1")
-                    WARNED = True
+                with _warn_lock:
+                    if not WARNED:
+                        print("[ INFO ] Encountered quite large input images (>1.6K pixels width), rescaling to 1.6K.\n "
+                            "If this is not desired, please explicitly specify '--resolution/-r' as 1")
+                        WARNED = True
                 global_down = orig_w / 1600
             else:
                 global_down = 1
@@ -60,20 +62,104 @@ def loadCam(args, id, cam_info, resolution_scale, is_nerf_synthetic, is_test_dat
         scale = float(global_down) * float(resolution_scale)
         resolution = (int(orig_w / scale), int(orig_h / scale))
 
+    if cam_info.depth_path != "":
+        import cv2
+        try:
+            if cache_dir:
+                # Cached maps are resized in their stored type, Camera's resize is then a no-op
+                invdepthmap = resized_depth_array(cam_info.depth_path, resolution, cache_dir).astype(np.float32)
+            elif decoded is not None and decoded[1] is not None:
+                invdepthmap = cv2.resize(decoded[1], resolution, interpolation=cv2.INTER_AREA).astype(np.float32)
+            else:
+                invdepthmap = cv2.imread(cam_info.depth_path, -1).astype(np.float32)
+            invdepthmap /= 512 if is_nerf_synthetic else float(2**16)
+
+        except FileNotFoundError:
+            print(f"Error: The depth file at path '{cam_info.depth_path}' was not found.")
+            raise
+        except IOError:
+            print(f"Error: Unable to open the image file '{cam_info.depth_path}'. It may be corrupted or an unsupported format.")
+            raise
+        except Exception as e:
+            print(f"An unexpected error occurred when trying to read depth at {cam_info.depth_path}: {e}")
+            raise
+    else:
+        invdepthmap = None
+        
+    image_loader = None
+    if image_cache is not None:
+        # Only the header has been read so far, decoding is deferred to the cache
+        if decoded is None:
+            image.close()
+        image = None
+        image_loader = partial(load_image_from_path, cam_info.image_path, resolution,
+                               args.train_test_exp, is_test_dataset, cam_info.is_test, cache_dir, compact_images)
+    elif cache_dir:
+        if decoded is None:
+            image.close()
+        image = resized_image_array(cam_info.image_path, resolution, cache_dir, "c" if shared_store else "r")
+    elif decoded is not None:
+        # Area (box) filter from the single decode, for every level of the pyramid
+        image = np.asarray(image.resize(resolution, Image.BOX))
+
     return Camera(resolution, colmap_id=cam_info.uid, R=cam_info.R, T=cam_info.T, 
                   FoVx=cam_info.FovX, FoVy=cam_info.FovY, depth_params=cam_info.depth_params,
                   image=image, invdepthmap=invdepthmap,
                   image_name=cam_info.image_name, uid=id, data_device=args.data_device,
-                  train_test_exp=args.train_test_exp, is_test_dataset=is_test_dataset, is_test_view=cam_info.is_test)
+                  train_test_exp=args.train_test_exp, is_test_dataset=is_test_dataset, is_test_view=cam_info.is_test,
+                  image_loader=image_loader, image_cache=image_cache, compact_images=compact_images,
+                  half_depth=getattr(args, "half_precision_depth", False))
+
+def _load_ordered(load, cam_infos, args):
+    num_workers = getattr(args, "camera_load_workers", 1)
+    if num_workers <= 0:
+        num_workers = min(8, os.cpu_count() or 1)
 
-def cameraList_from_camInfos(cam_infos, resolution_scale, args, is_nerf_synthetic, is_test_dataset):
-    camera_list = []
+    if num_workers == 1 or len(cam_infos) <= 1:
+        return [load(item) for item in enumerate(cam_infos)]
 
-    for id, c in enumerate(cam_infos):
-        camera_list.append(loadCam(args, id, c, resolution_scale, is_nerf_synthetic, is_test_dataset))
+    # PIL decoding/resizing and cv2.imread release the GIL, so threads overlap them; map() keeps the order
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="camera_loader") as pool:
+        return list(pool.map(load, enumerate(cam_infos)))
 
+def cameraList_from_camInfos(cam_infos, resolution_scale, args, is_nerf_synthetic, is_test_dataset, image_cache=None):
+    def load(item):
+        id, c = item
+        return loadCam(args, id, c, resolution_scale, is_nerf_synthetic, is_test_dataset, image_cache)
+
+    camera_list = _load_ordered(load, cam_infos, args)
+    CameraBank(camera_list)
     return camera_list
 
+def cameraPyramid_from_camInfos(cam_infos, resolution_scales, args, is_nerf_synthetic, is_test_dataset, image_cache=None):
+    """
+    Loads the cameras at every scale in resolution_scales, returned as
+    {scale: camera list}. Each image (and depth map) is decoded once and every
+    level is resized from it with an area filter. A single scale, lazy images and
+    the on-disk caches keep the per-scale loading of cameraList_from_camInfos.
+    """
+    cache_dir = getattr(args, "preprocessed_cache_dir", "") or getattr(args, "shared_image_store", "")
+    if len(resolution_scales) == 1 or image_cache is not None or cache_dir:
+        return {scale: cameraList_from_camInfos(cam_infos, scale, args, is_nerf_synthetic, is_test_dataset, image_cache)
+                for scale in resolution_scales}
+
+    def load(item):
+        id, c = item
+        with Image.open(c.image_path) as image:
+            image.load()
+            depth = None
+            if c.depth_path != "":
+                import cv2
+                depth = cv2.imread(c.depth_path, -1)
+            return [loadCam(args, id, c, scale, is_nerf_synthetic, is_test_dataset, decoded=(image, depth))
+                    for scale in resolution_scales]
+
+    levels = _load_ordered(load, cam_infos, args)
+    pyramid = {scale: [cameras[level] for cameras in levels] for level, scale in enumerate(resolution_scales)}
+    for camera_list in pyramid.values():
+        CameraBank(camera_list)
+    return pyramid
+
 def camera_to_JSON(id, camera : Camera):
     Rt = np.zeros((4, 4))
     Rt[:3, :3] = camera.R.transpose()
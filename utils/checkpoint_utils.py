@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import queue
+import struct
+import numpy as np
+import torch
+from concurrent.futures import ThreadPoolExecutor
+
+# Layout: MAGIC | uint64 header length | JSON header | tensor blobs, each starting on
+# an ALIGNMENT boundary so they can be viewed straight out of a memory map.
+MAGIC = b"GSCKPT01"
+ALIGNMENT = 64
+CHECKPOINT_EXTENSION = ".gsckpt"
+
+# Order of the tensors in GaussianModel.capture(), by their name in the container
+CAPTURE_TENSORS = {
+    1: "params/xyz",
+    2: "params/features_dc",
+    3: "params/features_rest",
+    4: "params/scaling",
+    5: "params/rotation",
+    6: "params/opacity",
+    7: "stats/max_radii2D",
+    8: "stats/xyz_gradient_accum",
+    9: "stats/denom",
+    13: "cluster_centers",
+    14: "xyz_initial"
+}
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def flatten_capture(captured):
+    """
+    Splits a GaussianModel.capture() tuple into named tensors and a
+    JSON-serialisable dict of everything else.
+    """
+    tensors = {name: captured[idx] for idx, name in CAPTURE_TENSORS.items()}
+    meta = {
+        "active_sh_degree": captured[0],
+        "spatial_lr_scale": float(captured[11]),
+        "pruning_count": captured[12],
+        "param_groups": None
+    }
+    opt_dict = captured[10]
+    if opt_dict is not None:
+        meta["param_groups"] = opt_dict["param_groups"]
+        for param_id, state in opt_dict["state"].items():
+            for key, value in state.items():
+                tensors["optimizer/{}/{}".format(param_id, key)] = value if torch.is_tensor(value) else torch.tensor(value)
+    return tensors, meta
+
+def write_checkpoint(path, tensors, meta, iteration):
+    entries = {}
+    arrays = {}
+    offset = 0
+    for name, tensor in tensors.items():
+        array = tensor if isinstance(tensor, np.ndarray) else tensor.detach().cpu().contiguous().numpy()
+        arrays[name] = array
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset, "nbytes": array.nbytes}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({"iteration": iteration, "meta": meta, "tensors": entries}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            array.tofile(f)
+        # Make sure the file covers the final padding of the last blob
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+def save_checkpoint(path, captured, iteration):
+    tensors, meta = flatten_capture(captured)
+    write_checkpoint(path, tensors, meta, iteration)
+
+def is_native_checkpoint(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+class CheckpointFile:
+    """
+    Memory-mapped view of a native checkpoint. Only the JSON header is parsed on
+    open; tensors are read lazily by load(), so e.g. the parameters can be pulled
+    without ever touching the pages holding the Adam moments.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Not a native checkpoint: {}".format(path))
+            header_size = struct.unpack("<Q", f.read(8))[0]
+            header = json.loads(f.read(header_size).decode("utf-8"))
+        self.iteration = header["iteration"]
+        self.meta = header["meta"]
+        self.entries = header["tensors"]
+        self.data_start = _align(len(MAGIC) + 8 + header_size)
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self.base = None
+
+    def keys(self):
+        delta = self.meta.get("delta")
+        return delta["keys"] if delta else self.entries.keys()
+
+    def view(self, name):
+        entry = self.entries[name]
+        start = self.data_start + entry["offset"]
+        return self.buffer[start:start + entry["nbytes"]].view(np.dtype(entry["dtype"])).reshape(entry["shape"])
+
+    def load(self, name, device="cuda"):
+        # np.array copies out of the (read-only) map; the result owns its memory
+        if name in self.entries:
+            return torch.from_numpy(np.array(self.view(name))).to(device)
+        delta = self.meta.get("delta")
+        if delta is None:
+            raise KeyError(name)
+        # Delta checkpoint: start from the full checkpoint it was taken against
+        if self.base is None:
+            self.base = CheckpointFile(os.path.join(os.path.dirname(self.path), delta["base"]))
+        tensor = self.base.load(name, device)
+        if name + "@rows" in self.entries:
+            rows = torch.from_numpy(np.array(self.view(name + "@rows"))).to(device)
+            tensor[rows] = torch.from_numpy(np.array(self.view(name + "@values"))).to(device)
+        return tensor
+
+def load_checkpoint(path, with_optimizer=True, device="cuda"):
+    """
+    Returns (model_args, iteration) in the layout expected by GaussianModel.restore().
+    With with_optimizer=False the Adam state is not read and restore() starts from a
+    fresh optimizer.
+    """
+    ckpt = CheckpointFile(path)
+    meta = ckpt.meta
+    captured = [None] * 15
+    for idx, name in CAPTURE_TENSORS.items():
+        captured[idx] = ckpt.load(name, device)
+    for idx in (1, 2, 3, 4, 5, 6):
+        captured[idx] = torch.nn.Parameter(captured[idx].requires_grad_(True))
+    captured[0] = meta["active_sh_degree"]
+    captured[11] = meta["spatial_lr_scale"]
+    captured[12] = meta["pruning_count"]
+
+    if with_optimizer and meta["param_groups"] is not None:
+        state = {}
+        for name in ckpt.keys():
+            if not name.startswith("optimizer/"):
+                continue
+            _, param_id, key = name.split("/")
+            # Adam keeps its step counter on the host
+            state.setdefault(int(param_id), {})[key] = ckpt.load(name, "cpu" if key == "step" else device)
+        param_groups = meta["param_groups"]
+        for group in param_groups:
+            if "betas" in group:
+                group["betas"] = tuple(group["betas"])
+        captured[10] = {"state": state, "param_groups": param_groups}
+    return tuple(captured), ckpt.iteration
+
+def delta_against(tensors, base_arrays):
+    """
+    Encodes host arrays relative to the arrays of a full checkpoint. Tensors equal to
+    the base are dropped, tensors whose shape changed (densification / pruning) or
+    with more than half of their rows changed are kept whole, the rest are stored as
+    changed row indices plus values.
+    """
+    encoded = {}
+    for name, array in tensors.items():
+        base = base_arrays.get(name)
+        if base is None or base.shape != array.shape or array.ndim == 0:
+            encoded[name] = array
+            continue
+        rows = array.shape[0]
+        changed = np.any(array.reshape(rows, -1) != base.reshape(rows, -1), axis=1) if rows > 0 else np.zeros(0, dtype=bool)
+        num_changed = int(changed.sum())
+        if num_changed == 0:
+            continue
+        if num_changed * 2 > rows:
+            encoded[name] = array
+        else:
+            indices = np.nonzero(changed)[0]
+            encoded[name + "@rows"] = indices
+            encoded[name + "@values"] = array[indices]
+    return encoded
+
+class CheckpointWriter:
+    """
+    Background writer for native checkpoints.
+
+    submit() snapshots the model into pinned host buffers with non-blocking copies
+    and returns; a worker thread waits for the copies and writes the file. At most
+    max_in_flight snapshots are pending, submit() blocks when that many are queued.
+    With full_every > 1 only every full_every-th checkpoint is written whole, the
+    ones in between are deltas against the last full one. keep_last > 0 removes all
+    but the newest keep_last checkpoints (plus the full checkpoints they depend on),
+    keep_every > 0 additionally keeps every checkpoint whose iteration is a multiple
+    of it.
+    """
+
+    def __init__(self, model_path, max_in_flight=2, full_every=1, keep_last=0, keep_every=0, blocking=False):
+        self.model_path = model_path
+        self.full_every = max(1, full_every)
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.blocking = blocking
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint_writer")
+        # Pinned buffer sets double as in-flight tokens
+        self.slots = queue.Queue()
+        for _ in range(max(1, max_in_flight)):
+            self.slots.put({})
+        self.pending = []
+        self.count = 0
+        self.base_name = None
+        self.base_arrays = {}
+        self.written = []
+
+    def _snapshot(self, tensors, slot):
+        host = {}
+        for name, tensor in tensors.items():
+            tensor = tensor.detach()
+            buffer = slot.get(name)
+            if buffer is None or buffer.dtype != tensor.dtype or buffer.numel() < tensor.numel():
+                buffer = torch.empty(max(tensor.numel(), 1), dtype=tensor.dtype, pin_memory=torch.cuda.is_available())
+                slot[name] = buffer
+            host[name] = buffer[:tensor.numel()].view(tensor.shape)
+            host[name].copy_(tensor, non_blocking=True)
+        copy_done = None
+        if torch.cuda.is_available():
+            copy_done = torch.cuda.Event()
+            copy_done.record()
+        return host, copy_done
+
+    def submit(self, captured, iteration):
+        self._reap()
+        tensors, meta = flatten_capture(captured)
+        slot = self.slots.get()
+        host, copy_done = self._snapshot(tensors, slot)
+        full = self.count % self.full_every == 0
+        self.count += 1
+        future = self.executor.submit(self._write, host, meta, iteration, full, copy_done, slot)
+        self.pending.append(future)
+        if self.blocking:
+            future.result()
+        return future
+
+    def _write(self, host, meta, iteration, full, copy_done, slot):
+        try:
+            if copy_done is not None:
+                copy_done.synchronize()
+            arrays = {name: tensor.numpy() for name, tensor in host.items()}
+            name = "chkpnt" + str(iteration) + CHECKPOINT_EXTENSION
+            base = None
+            if full or self.base_name is None:
+                # Keep a private copy: the pinned buffers are reused by later snapshots
+                self.base_arrays = {key: np.array(array) for key, array in arrays.items()}
+                self.base_name = name
+            else:
+                base = self.base_name
+                meta = dict(meta, delta={"base": base, "keys": list(arrays.keys())})
+                arrays = delta_against(arrays, self.base_arrays)
+            write_checkpoint(os.path.join(self.model_path, name), arrays, meta, iteration)
+        finally:
+            self.slots.put(slot)
+        self.written.append((iteration, name, base))
+        self._rotate()
+
+    def _rotate(self):
+        if self.keep_last <= 0:
+            return
+        keep = set(name for _, name, _ in self.written[-self.keep_last:])
+        keep.update(name for iteration, name, _ in self.written if self.keep_every > 0 and iteration % self.keep_every == 0)
+        keep.update(base for _, name, base in self.written if name in keep and base is not None)
+        keep.add(self.base_name)
+        for _, name, _ in self.written:
+            if name not in keep:
+                path = os.path.join(self.model_path, name)
+                if os.path.exists(path):
+                    os.remove(path)
+        self.written = [entry for entry in self.written if entry[1] in keep]
+
+    def _reap(self):
+        # Surface errors from writes that already finished instead of dropping them
+        for future in [f for f in self.pending if f.done()]:
+            self.pending.remove(future)
+            future.result()
+
+    def wait(self):
+        while self.pending:
+            self.pending.pop(0).result()
+
+def _measure_load(path, native, with_optimizer):
+    import resource
+    start = time.perf_counter()
+    if native:
+        model_args, _ = load_checkpoint(path, with_optimizer, device="cpu")
+    else:
+        model_args, _ = torch.load(path, map_location="cpu")
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def compare_formats(pth_path):
+    """
+    Converts a torch.save checkpoint to the native format next to it and reports
+    load time and peak resident memory of each, every load in a fresh process.
+    """
+    import multiprocessing
+    native_path = os.path.splitext(pth_path)[0] + CHECKPOINT_EXTENSION
+    model_args, iteration = torch.load(pth_path, map_location="cpu")
+    save_checkpoint(native_path, model_args, iteration)
+    del model_args
+
+    ctx = multiprocessing.get_context("spawn")
+    runs = [("pickle (.pth)", pth_path, False, True),
+            ("native, full", native_path, True, True),
+            ("native, params only", native_path, True, False)]
+    print("{:<22}{:>12}{:>18}".format("format", "load [s]", "peak RSS [MB]"))
+    for label, path, native, with_optimizer in runs:
+        with ctx.Pool(1) as pool:
+            elapsed, peak = pool.apply(_measure_load, (path, native, with_optimizer))
+        print("{:<22}{:>12.3f}{:>18.1f}".format(label, elapsed, peak))
+
+if __name__ == "__main__":
+    # python -m utils.checkpoint_utils <chkpnt.pth>
+    compare_formats(sys.argv[1])
@@ -0,0 +1,71 @@
+import torch
+from utils.image_utils import psnr
+
+class ConvergenceMonitor:
+    """
+    Tracks the PSNR of a small validation subset to detect when training plateaus.
+
+    The subset is num_views evenly spaced training cameras, at most one in ten,
+    which train.py holds out of training (see training_cameras()). Test cameras
+    are never used, so the test metrics stay independent of when training stops.
+    The ground truth of the subset is kept on the device so an evaluation costs
+    num_views renders. evaluate() is called every `interval`
+    iterations and returns "plateau" once the best PSNR has not improved by
+    min_gain dB per 1000 views for `patience` evaluations in a row, None otherwise.
+    Comparing against the best value keeps the short dips after an opacity reset
+    from being read as convergence unless they outlast the patience.
+    """
+
+    def __init__(self, scene, num_views=8, interval=1000, min_gain=0.05, patience=3, views_per_step=1):
+        cameras = scene.getTrainCameras()
+        num_views = min(num_views, len(cameras) // 10)
+        step = max(1, len(cameras) // max(num_views, 1))
+        self.cameras = cameras[::step][:num_views]
+        self.ground_truth = [torch.clamp(camera.original_image.to("cuda"), 0.0, 1.0) for camera in self.cameras]
+        self.interval = interval
+        self.min_gain = min_gain
+        self.patience = patience
+        self.views_per_step = views_per_step
+        self.best_psnr = None
+        self.best_iteration = 0
+        self.stale = 0
+        self.history = []
+
+    def training_cameras(self, cameras):
+        """ cameras without the held-out validation views. """
+        held_out = set(id(camera) for camera in self.cameras)
+        return [camera for camera in cameras if id(camera) not in held_out]
+
+    def reset(self):
+        """ Restarts the patience count, e.g. after densification was stopped. """
+        self.stale = 0
+
+    def _mean_psnr(self, gaussians, renderFunc, renderArgs, train_test_exp):
+        total = 0.0
+        for camera, gt_image in zip(self.cameras, self.ground_truth):
+            image = torch.clamp(renderFunc(camera, gaussians, *renderArgs)["render"], 0.0, 1.0)
+            if train_test_exp:
+                image = image[..., image.shape[-1] // 2:]
+                gt_image = gt_image[..., gt_image.shape[-1] // 2:]
+            total += psnr(image, gt_image).mean().double()
+        return (total / len(self.cameras)).item()
+
+    def evaluate(self, iteration, gaussians, renderFunc, renderArgs, train_test_exp):
+        if not self.cameras or self.interval <= 0 or iteration % self.interval != 0:
+            return None
+        value = self._mean_psnr(gaussians, renderFunc, renderArgs, train_test_exp)
+        self.history.append((iteration, value))
+        if self.best_psnr is None:
+            self.best_psnr, self.best_iteration = value, iteration
+            return None
+
+        # Required gain scales with the views rendered since the best evaluation
+        required = self.min_gain * (iteration - self.best_iteration) * self.views_per_step / 1000.0
+        if value > self.best_psnr + required:
+            self.best_psnr, self.best_iteration = value, iteration
+            self.stale = 0
+            return None
+        if value > self.best_psnr:
+            self.best_psnr = value
+        self.stale += 1
+        return "plateau" if self.stale >= self.patience else None
@@ -19,8 +19,12 @@ def inverse_sigmoid(x):
     return torch.log(x/(1-x))
 
 def PILtoTorch(pil_image, resolution):
-    resized_image_PIL = pil_image.resize(resolution)
-    resized_image = torch.from_numpy(np.array(resized_image_PIL)) / 255.0
+    return ArrayToTorch(pil_image.resize(resolution))
+
+def ArrayToTorch(image, normalize=True, copy=True):
+    resized_image = torch.from_numpy(np.array(image) if copy else image)
+    if normalize:
+        resized_image = resized_image / 255.0
     if len(resized_image.shape) == 3:
         return resized_image.permute(2, 0, 1)
     else:
@@ -61,6 +65,24 @@ def get_expon_lr_func(
 
     return helper
 
+def compress_lr_func(lr_func, lr_final, start_step, end_step):
+    """
+    Follows lr_func up to start_step, then decays log-linearly from the rate it had
+    there to lr_final at end_step, and stays at lr_final afterwards. Used to fit the
+    tail of a schedule into a shortened run.
+    """
+    lr_start = lr_func(start_step)
+    if lr_start <= 0.0 or lr_final <= 0.0:
+        return lr_func
+    tail = get_expon_lr_func(lr_start, lr_final, max_steps=max(end_step - start_step, 1))
+
+    def helper(step):
+        if step <= start_step:
+            return lr_func(step)
+        return tail(step - start_step)
+
+    return helper
+
 def strip_lowerdiag(L):
     uncertainty = torch.zeros((L.shape[0], 6), dtype=torch.float, device="cuda")
 
@@ -109,6 +131,26 @@ def build_scaling_rotation(s, r):
     L = R @ L
     return L
 
+def _spread_bits_21(v):
+    # Inserts two zero bits between each of the low 21 bits of v (int64)
+    v = v & 0x1fffff
+    v = (v | (v << 32)) & 0x1f00000000ffff
+    v = (v | (v << 16)) & 0x1f0000ff0000ff
+    v = (v | (v << 8)) & 0x100f00f00f00f00f
+    v = (v | (v << 4)) & 0x10c30c30c30c30c3
+    v = (v | (v << 2)) & 0x1249249249249249
+    return v
+
+def morton_codes(points):
+    """
+    63-bit Morton (Z-order) keys of an (N, 3) tensor, quantised to 21 bits per axis
+    over the bounding box of the points.
+    """
+    mins = points.min(dim=0).values
+    extent = (points.max(dim=0).values - mins).clamp_min(1e-12)
+    grid = ((points - mins) / extent * (2 ** 21 - 1)).long()
+    return _spread_bits_21(grid[:, 0]) | (_spread_bits_21(grid[:, 1]) << 1) | (_spread_bits_21(grid[:, 2]) << 2)
+
 def safe_state(silent):
     old_f = sys.stdout
     class F:
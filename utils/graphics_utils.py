@@ -48,6 +48,36 @@ def getWorld2View2(R, t, translate=np.array([.0, .0, .0]), scale=1.0):
     Rt = np.linalg.inv(C2W)
     return np.float32(Rt)
 
+def getWorld2View2Batch(R, t, translate=np.array([.0, .0, .0]), scale=1.0):
+    """
+    getWorld2View2 for (N, 3, 3) R and (N, 3) t (translate / scale broadcast over
+    N), in closed form: the camera center of [R^T | t] is -R t.
+    """
+    R = np.asarray(R, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    cam_center = (-np.einsum("nij,nj->ni", R, t) + translate) * np.reshape(scale, (-1, 1))
+    Rt = np.zeros((R.shape[0], 4, 4))
+    Rt[:, :3, :3] = np.transpose(R, (0, 2, 1))
+    Rt[:, :3, 3] = -np.einsum("nji,nj->ni", R, cam_center)
+    Rt[:, 3, 3] = 1.0
+    return np.float32(Rt)
+
+def getProjectionMatrixBatch(znear, zfar, fovX, fovY):
+    """ getProjectionMatrix for (N,) tensors of fields of view. """
+    tanHalfFovY = torch.tan(fovY / 2)
+    tanHalfFovX = torch.tan(fovX / 2)
+
+    P = torch.zeros(fovX.shape[0], 4, 4, dtype=fovX.dtype, device=fovX.device)
+    z_sign = 1.0
+
+    # Symmetric frustum: right + left = top + bottom = 0
+    P[:, 0, 0] = 1.0 / tanHalfFovX
+    P[:, 1, 1] = 1.0 / tanHalfFovY
+    P[:, 3, 2] = z_sign
+    P[:, 2, 2] = z_sign * zfar / (zfar - znear)
+    P[:, 2, 3] = -(zfar * znear) / (zfar - znear)
+    return P
+
 def getProjectionMatrix(znear, zfar, fovX, fovY):
     tanHalfFovY = math.tan((fovY / 2))
     tanHalfFovX = math.tan((fovX / 2))
@@ -0,0 +1,85 @@
+import time
+import torch
+from concurrent.futures import ThreadPoolExecutor
+
+class MetricBuffer:
+    """
+    Collects the per-iteration training scalars without synchronizing with the GPU.
+
+    record() keeps the scalars as device tensors (python numbers pass through) and
+    the CUDA events around the iteration. Every flush_interval iterations the
+    buffered tensors are stacked and copied to the host with one non-blocking copy;
+    a worker thread waits for that copy, then updates the progress bar (loss EMAs
+    as before) and writes the scalars and iteration times to TensorBoard.
+    """
+
+    def __init__(self, tb_writer, progress_bar, flush_interval=50):
+        self.tb_writer = tb_writer
+        self.progress_bar = progress_bar
+        self.flush_interval = max(1, flush_interval)
+        self.records = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metric_flush")
+        self.pending = []
+        self.ema_loss = 0.0
+        self.ema_Ll1depth = 0.0
+        self.start_time = None
+        self.count = 0
+
+    def record(self, iteration, Ll1, loss, Ll1depth, iter_start=None, iter_end=None):
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        self.count += 1
+        self.records.append((iteration, {"l1_loss": Ll1, "total_loss": loss, "depth_loss": Ll1depth}, iter_start, iter_end))
+        if len(self.records) >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        records, self.records = self.records, []
+        # Device scalars of the whole window go to the host in a single copy
+        device_keys = [(idx, name) for idx, (_, values, _, _) in enumerate(records) for name, value in values.items() if torch.is_tensor(value)]
+        host_values = None
+        copy_done = None
+        if device_keys:
+            stacked = torch.stack([records[idx][1][name].detach().float().reshape(()) for idx, name in device_keys])
+            host_values = stacked.to("cpu", non_blocking=True)
+            if stacked.is_cuda:
+                copy_done = torch.cuda.Event()
+                copy_done.record()
+        future = self.executor.submit(self._write, records, device_keys, host_values, copy_done)
+        self.pending = [f for f in self.pending if not f.done()] + [future]
+
+    def _write(self, records, device_keys, host_values, copy_done):
+        if copy_done is not None:
+            copy_done.synchronize()
+        if host_values is not None:
+            for (idx, name), value in zip(device_keys, host_values.tolist()):
+                records[idx][1][name] = value
+
+        for iteration, values, iter_start, iter_end in records:
+            self.ema_loss = 0.4 * values["total_loss"] + 0.6 * self.ema_loss
+            self.ema_Ll1depth = 0.4 * values["depth_loss"] + 0.6 * self.ema_Ll1depth
+            if self.tb_writer:
+                self.tb_writer.add_scalar('train_loss_patches/l1_loss', values["l1_loss"], iteration)
+                self.tb_writer.add_scalar('train_loss_patches/total_loss', values["total_loss"], iteration)
+                if iter_start is not None:
+                    # Recorded before the copy, so both events have completed
+                    self.tb_writer.add_scalar('iter_time', iter_start.elapsed_time(iter_end), iteration)
+
+        if self.progress_bar is not None:
+            self.progress_bar.set_postfix({"Loss": f"{self.ema_loss:.{7}f}", "Depth Loss": f"{self.ema_Ll1depth:.{7}f}"})
+            self.progress_bar.update(len(records))
+
+    def close(self):
+        """ Flushes the remaining records, waits for the worker and returns the iterations per second. """
+        self.flush()
+        for future in self.pending:
+            future.result()
+        self.pending = []
+        self.executor.shutdown(wait=True)
+        if self.progress_bar is not None:
+            self.progress_bar.close()
+        if self.start_time is None or self.count < 2:
+            return 0.0
+        return self.count / max(time.perf_counter() - self.start_time, 1e-9)
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Single background writer: snapshots are encoded and written in submission order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ply_writer")
+_pending = []
+# Every queued snapshot holds a pinned host copy of the model, at most this many are in flight
+MAX_PENDING_PLY_WRITES = 2
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8"
+}
+PLY_ENDIANNESS = {"binary_little_endian": "<", "binary_big_endian": ">"}
+
+def write_ply_binary(path, attribute_names, attributes):
+    """
+    Writes an (N, F) float32 array as a binary little-endian PLY 'vertex' element
+    with one float property per column. The body is the array bytes as-is, which
+    is the same layout plyfile produces, without building per-row tuples.
+    """
+    attributes = np.ascontiguousarray(attributes, dtype='<f4')
+    assert attributes.ndim == 2 and attributes.shape[1] == len(attribute_names)
+    header = ["ply", "format binary_little_endian 1.0", "element vertex {}".format(attributes.shape[0])]
+    header += ["property float {}".format(name) for name in attribute_names]
+    header.append("end_header")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        attributes.tofile(f)
+    os.replace(tmp_path, path)
+
+def _write_snapshot(path, attribute_names, host_tensor, copy_done):
+    copy_done.synchronize()
+    write_ply_binary(path, attribute_names, host_tensor.numpy())
+
+def reserve_ply_write_slot(max_in_flight=MAX_PENDING_PLY_WRITES):
+    """
+    Drops finished writes, re-raising their errors, and blocks on the oldest ones
+    until fewer than max_in_flight remain. Called before a new snapshot is pinned.
+    """
+    while _pending and (_pending[0].done() or len(_pending) >= max_in_flight):
+        _pending.pop(0).result()
+    for future in [f for f in _pending if f.done()]:
+        _pending.remove(future)
+        future.result()
+
+def submit_ply_write(path, attribute_names, host_tensor, copy_done):
+    """
+    Hands a pinned host snapshot to the background writer. copy_done is the CUDA
+    event recorded after the non-blocking device-to-host copy into host_tensor.
+    Reserve a slot with reserve_ply_write_slot() before pinning the snapshot.
+    """
+    future = _writer.submit(_write_snapshot, path, attribute_names, host_tensor, copy_done)
+    _pending.append(future)
+    return future
+
+def wait_for_ply_writes():
+    """ Waits for every queued write, re-raising the first failure. """
+    while _pending:
+        _pending.pop(0).result()
+
+def memmap_ply_vertices(path):
+    """
+    Parses the PLY header and memory-maps the 'vertex' element as a structured
+    np.memmap, so columns can be read as strided views without decoding the file.
+    Raises ValueError for layouts that cannot be mapped (ASCII, list properties,
+    vertex not being the first element); callers fall back to plyfile then.
+    """
+    endian = None
+    count = None
+    properties = []
+    in_vertex = False
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError("Not a PLY file: {}".format(path))
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError("Truncated PLY header: {}".format(path))
+            tokens = line.decode("ascii").split()
+            if not tokens or tokens[0] in ("comment", "obj_info"):
+                continue
+            if tokens[0] == "format":
+                if tokens[1] not in PLY_ENDIANNESS:
+                    raise ValueError("Cannot memory-map PLY format '{}'".format(tokens[1]))
+                endian = PLY_ENDIANNESS[tokens[1]]
+            elif tokens[0] == "element":
+                if count is None and tokens[1] != "vertex":
+                    raise ValueError("First PLY element is '{}', expected 'vertex'".format(tokens[1]))
+                in_vertex = count is None
+                if in_vertex:
+                    count = int(tokens[2])
+            elif tokens[0] == "property" and in_vertex:
+                if tokens[1] == "list":
+                    raise ValueError("Cannot memory-map list property '{}'".format(tokens[-1]))
+                properties.append((tokens[2], endian + PLY_TYPES[tokens[1]]))
+            elif tokens[0] == "end_header":
+                break
+        header_size = f.tell()
+
+    if endian is None or count is None:
+        raise ValueError("Missing format or vertex element in PLY header: {}".format(path))
+    return np.memmap(path, dtype=np.dtype(properties), mode="r", offset=header_size, shape=(count,))
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def _entry_path(cache_dir, source_path, resolution):
+    stat = os.stat(source_path)
+    key = "{}|{}|{}|{}x{}".format(os.path.abspath(source_path), stat.st_mtime_ns, stat.st_size, *resolution)
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, "{}_{}.npy".format(name, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]))
+
+def _load_entry(path, mmap_mode):
+    if os.path.exists(path):
+        try:
+            return np.load(path, mmap_mode=mmap_mode)
+        except (OSError, ValueError):
+            pass
+    return None
+
+def cached_array(source_path, resolution, cache_dir, produce, mmap_mode="r"):
+    """
+    Returns produce() for source_path at the given (width, height) resolution,
+    through a .npy file in cache_dir keyed by the source path, mtime, size and
+    resolution. Hits are memory-mapped; an empty cache_dir disables the cache.
+    Where flock is available, concurrent processes missing the same entry wait
+    for the first one instead of producing it again; the .lock file is removed
+    once the entry is written.
+    """
+    if not cache_dir:
+        return produce()
+    path = _entry_path(cache_dir, source_path, resolution)
+    array = _load_entry(path, mmap_mode)
+    if array is not None:
+        return array
+
+    lock_file = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if fcntl is not None:
+            lock_file = open(path + ".lock", "w")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            array = _load_entry(path, mmap_mode)
+            if array is not None:
+                return array
+
+        array = np.ascontiguousarray(produce())
+        try:
+            tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("Could not write preprocessed cache entry {}: {}".format(path, e))
+            return array
+        if lock_file is not None:
+            # Waiters on the unlinked lock re-check and find the entry, later callers never lock
+            try:
+                os.remove(lock_file.name)
+            except OSError:
+                pass
+        # Hand out the mapping rather than the private copy, so the first process shares it too
+        mapped = _load_entry(path, mmap_mode)
+        return mapped if mapped is not None else array
+    finally:
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+def resized_image_array(image_path, resolution, cache_dir="", mmap_mode="r"):
+    """ The image resized to resolution as PIL produces it, as a uint8 (H, W[, C]) array. """
+    def produce():
+        with Image.open(image_path) as image:
+            return np.asarray(image.resize(resolution))
+    return cached_array(image_path, resolution, cache_dir, produce, mmap_mode)
+
+def resized_depth_array(depth_path, resolution, cache_dir=""):
+    """ The depth map resized to resolution in its stored type (uint16 for 16 bit PNGs). """
+    def produce():
+        import cv2
+        depth = cv2.imread(depth_path, -1)
+        if depth is None:
+            raise FileNotFoundError(depth_path)
+        return cv2.resize(depth, resolution)
+    return cached_array(depth_path, resolution, cache_dir, produce)
@@ -33,6 +33,7 @@ import collections
 import numpy as np
 import struct
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 
 CameraModel = collections.namedtuple(
@@ -204,92 +205,335 @@ def write_cameras_binary(cameras, path_to_model_file):
     return cameras
 
 
+# Text models smaller than this are parsed in-process
+PARALLEL_TEXT_MIN_BYTES = 16 * 1024 * 1024
+
+
+def _is_image_header_line(line):
+    # Image lines have exactly 10 fields; 2D point lines a multiple of 3
+    return len(line.split()) == 10 and not line.startswith(b"#")
+
+
+def _line_aligned_ranges(path, num_chunks, is_record_start=None):
+    """
+    Splits a text file into about num_chunks byte ranges that start at the
+    beginning of a line (for which is_record_start holds, if given).
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as fid:
+        for k in range(1, num_chunks):
+            fid.seek(max(size * k // num_chunks, bounds[-1]))
+            if fid.tell() > 0:
+                fid.readline()
+            while is_record_start is not None:
+                position = fid.tell()
+                line = fid.readline()
+                if not line or is_record_start(line):
+                    fid.seek(position)
+                    break
+            bounds.append(fid.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _read_range(path, start, end):
+    with open(path, "rb") as fid:
+        fid.seek(start)
+        return fid.read(end - start)
+
+
+def _parse_in_chunks(parse_chunk, path, num_workers, is_record_start=None):
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers <= 1 or os.path.getsize(path) < PARALLEL_TEXT_MIN_BYTES:
+        return [parse_chunk(path, 0, os.path.getsize(path))]
+    ranges = _line_aligned_ranges(path, num_workers * 4, is_record_start)
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        return list(
+            pool.map(
+                parse_chunk,
+                [path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+            )
+        )
+
+
+def _parse_points3D_text_chunk(path, start, end):
+    data = _read_range(path, start, end)
+    if b"#" in data:
+        data = b"\n".join(
+            line for line in data.split(b"\n") if not line.lstrip().startswith(b"#")
+        )
+    raw = np.frombuffer(data, dtype=np.uint8)
+    is_newline = raw == 10
+    is_space = is_newline | (raw == 32) | (raw == 9) | (raw == 13)
+    token_start = ~is_space
+    token_start[1:] &= is_space[:-1]
+    # Tokens per line from the number of token starts before each line end
+    line_ends = np.append(np.flatnonzero(is_newline), raw.size)
+    tokens_before = np.searchsorted(np.flatnonzero(token_start), line_ends)
+    tokens_per_line = np.diff(tokens_before, prepend=0)
+    tokens_per_line = tokens_per_line[tokens_per_line > 0]
+
+    # One vectorised conversion for the whole chunk, lines are recovered from the token counts
+    values = np.fromstring(data.decode("utf-8"), dtype=np.float64, sep=" ")
+    line_starts = _offsets_from_lengths(tokens_per_line)[:-1]
+    position_in_line = np.arange(values.size) - np.repeat(line_starts, tokens_per_line)
+    tracks = values[position_in_line >= 8].reshape(-1, 2)
+    return {
+        "ids": values[line_starts].astype(np.int64),
+        "xyz": values[line_starts[:, None] + np.arange(1, 4)],
+        "rgb": values[line_starts[:, None] + np.arange(4, 7)].astype(np.uint8),
+        "error": values[line_starts + 7],
+        "track_lengths": (tokens_per_line - 8) // 2,
+        "image_ids": tracks[:, 0].astype(np.int32),
+        "point2D_idxs": tracks[:, 1].astype(np.int32),
+    }
+
+
+def _parse_images_text_chunk(path, start, end):
+    lines = _read_range(path, start, end).decode("utf-8").split("\n")
+    ids, qvecs, tvecs, camera_ids, names, xys, point3D_ids = [], [], [], [], [], [], []
+    idx = 0
+    while idx < len(lines):
+        line = lines[idx].strip()
+        idx += 1
+        if len(line) == 0 or line[0] == "#":
+            continue
+        elems = line.split()
+        ids.append(int(elems[0]))
+        qvecs.append(tuple(map(float, elems[1:5])))
+        tvecs.append(tuple(map(float, elems[5:8])))
+        camera_ids.append(int(elems[8]))
+        names.append(elems[9])
+        points = np.fromstring(lines[idx] if idx < len(lines) else "", dtype=np.float64, sep=" ")
+        idx += 1
+        points = points.reshape(-1, 3)
+        xys.append(points[:, :2])
+        point3D_ids.append(points[:, 2].astype(np.int64))
+    return {
+        "ids": np.array(ids, dtype=np.int64),
+        "qvecs": np.array(qvecs, dtype=np.float64).reshape(-1, 4),
+        "tvecs": np.array(tvecs, dtype=np.float64).reshape(-1, 3),
+        "camera_ids": np.array(camera_ids, dtype=np.int64),
+        "names": names,
+        "points2D_lengths": np.array([len(ids) for ids in point3D_ids], dtype=np.int64),
+        "xys": np.concatenate(xys + [np.zeros((0, 2))]),
+        "point3D_ids": np.concatenate(point3D_ids + [np.zeros(0, dtype=np.int64)]),
+    }
+
+
+def read_points3D_text_arrays(path, num_workers=None):
+    """
+    Parallel reader for points3D.txt with the output of
+    read_points3D_binary_arrays. The file is split into line-aligned byte ranges
+    that are parsed in a process pool, each with a single np.fromstring call.
+    """
+    chunks = _parse_in_chunks(_parse_points3D_text_chunk, path, num_workers)
+    merged = {
+        key: np.concatenate([chunk[key] for chunk in chunks])
+        for key in chunks[0]
+    }
+    merged["track_offsets"] = _offsets_from_lengths(merged.pop("track_lengths"))
+    return merged
+
+
+def read_images_text_arrays(path, num_workers=None):
+    """
+    Parallel reader for images.txt with the output of read_images_binary_arrays.
+    Byte ranges are aligned to image lines so each keeps its 2D points line.
+    """
+    chunks = _parse_in_chunks(
+        _parse_images_text_chunk, path, num_workers, _is_image_header_line
+    )
+    merged = {
+        key: np.concatenate([chunk[key] for chunk in chunks])
+        for key in chunks[0]
+        if key != "names"
+    }
+    merged["names"] = [name for chunk in chunks for name in chunk["names"]]
+    merged["points2D_offsets"] = _offsets_from_lengths(merged.pop("points2D_lengths"))
+    return merged
+
+
 def read_images_text(path):
     """
     see: src/colmap/scene/reconstruction.cc
         void Reconstruction::ReadImagesText(const std::string& path)
         void Reconstruction::WriteImagesText(const std::string& path)
     """
+    arrays = read_images_text_arrays(path)
+    offsets = arrays["points2D_offsets"]
     images = {}
-    with open(path, "r") as fid:
-        while True:
-            line = fid.readline()
-            if not line:
-                break
-            line = line.strip()
-            if len(line) > 0 and line[0] != "#":
-                elems = line.split()
-                image_id = int(elems[0])
-                qvec = np.array(tuple(map(float, elems[1:5])))
-                tvec = np.array(tuple(map(float, elems[5:8])))
-                camera_id = int(elems[8])
-                image_name = elems[9]
-                elems = fid.readline().split()
-                xys = np.column_stack(
-                    [
-                        tuple(map(float, elems[0::3])),
-                        tuple(map(float, elems[1::3])),
-                    ]
-                )
-                point3D_ids = np.array(tuple(map(int, elems[2::3])))
-                images[image_id] = Image(
-                    id=image_id,
-                    qvec=qvec,
-                    tvec=tvec,
-                    camera_id=camera_id,
-                    name=image_name,
-                    xys=xys,
-                    point3D_ids=point3D_ids,
-                )
+    for idx, image_id in enumerate(arrays["ids"].tolist()):
+        start, end = offsets[idx], offsets[idx + 1]
+        images[image_id] = Image(
+            id=image_id,
+            qvec=arrays["qvecs"][idx],
+            tvec=arrays["tvecs"][idx],
+            camera_id=int(arrays["camera_ids"][idx]),
+            name=arrays["names"][idx],
+            xys=arrays["xys"][start:end],
+            point3D_ids=arrays["point3D_ids"][start:end],
+        )
     return images
 
 
+# Fixed-size parts of the binary records, packed exactly as on disk
+POINT3D_HEADER_DTYPE = np.dtype(
+    [
+        ("id", "<u8"),
+        ("xyz", "<f8", (3,)),
+        ("rgb", "u1", (3,)),
+        ("error", "<f8"),
+        ("track_length", "<u8"),
+    ]
+)
+IMAGE_HEADER_DTYPE = np.dtype(
+    [
+        ("id", "<i4"),
+        ("qvec", "<f8", (4,)),
+        ("tvec", "<f8", (3,)),
+        ("camera_id", "<i4"),
+    ]
+)
+POINT2D_DTYPE = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+
+
+def _segment_mask(size, starts, lengths):
+    """Boolean mask of `size` bytes, True inside every [start, start + length)."""
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    non_empty = lengths > 0
+    starts = starts[non_empty]
+    delta = np.zeros(size + 1, dtype=np.int8)
+    delta[starts] = 1
+    delta[starts + lengths[non_empty]] = -1
+    return np.cumsum(delta[:-1], dtype=np.int8).view(bool)
+
+
+def _offsets_from_lengths(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def read_points3D_binary_arrays(path_to_model_file):
+    """
+    Bulk reader for points3D.bin. The file is read into one buffer, the only
+    per-point Python work is following the track lengths to find the record
+    boundaries; all fields are decoded through np.frombuffer views.
+
+    :return: dict of flat arrays: ids, xyz, rgb, error, image_ids and
+        point2D_idxs (all tracks back to back) and track_offsets, such that the
+        track of point i is [track_offsets[i], track_offsets[i + 1]).
+    """
+    with open(path_to_model_file, "rb") as fid:
+        data = fid.read()
+    num_points = struct.unpack_from("<Q", data, 0)[0]
+    unpack_length = struct.Struct("<Q").unpack_from
+    header_size = POINT3D_HEADER_DTYPE.itemsize
+
+    track_starts = []
+    track_lengths = []
+    offset = 8
+    for _ in range(num_points):
+        track_length = unpack_length(data, offset + header_size - 8)[0]
+        offset += header_size
+        track_starts.append(offset)
+        track_lengths.append(track_length)
+        offset += 8 * track_length
+
+    # Everything in the body that is not a track is a fixed-size header
+    body = np.frombuffer(data, dtype=np.uint8, count=offset - 8, offset=8)
+    in_track = _segment_mask(
+        body.size,
+        np.asarray(track_starts, dtype=np.int64) - 8,
+        8 * np.asarray(track_lengths, dtype=np.int64),
+    )
+    headers = body[~in_track].view(POINT3D_HEADER_DTYPE)
+    tracks = body[in_track].view("<i4").reshape(-1, 2)
+    return {
+        "ids": headers["id"].astype(np.int64),
+        "xyz": np.ascontiguousarray(headers["xyz"]),
+        "rgb": np.ascontiguousarray(headers["rgb"]),
+        "error": np.ascontiguousarray(headers["error"]),
+        "track_offsets": _offsets_from_lengths(track_lengths),
+        "image_ids": np.ascontiguousarray(tracks[:, 0]),
+        "point2D_idxs": np.ascontiguousarray(tracks[:, 1]),
+    }
+
+
+def read_images_binary_arrays(path_to_model_file):
+    """
+    Bulk reader for images.bin, see read_points3D_binary_arrays.
+
+    :return: dict with ids, qvecs, tvecs, camera_ids, names (list), xys and
+        point3D_ids (all observations back to back) and points2D_offsets.
+    """
+    with open(path_to_model_file, "rb") as fid:
+        data = fid.read()
+    num_reg_images = struct.unpack_from("<Q", data, 0)[0]
+    unpack_length = struct.Struct("<Q").unpack_from
+    header_size = IMAGE_HEADER_DTYPE.itemsize
+
+    header_starts = []
+    names = []
+    points_starts = []
+    points_lengths = []
+    offset = 8
+    for _ in range(num_reg_images):
+        header_starts.append(offset)
+        name_end = data.index(b"\x00", offset + header_size)
+        names.append(data[offset + header_size:name_end].decode("utf-8"))
+        num_points2D = unpack_length(data, name_end + 1)[0]
+        points_starts.append(name_end + 9)
+        points_lengths.append(num_points2D)
+        offset = name_end + 9 + POINT2D_DTYPE.itemsize * num_points2D
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    header_index = np.asarray(header_starts, dtype=np.int64)[:, None] + np.arange(header_size)
+    headers = raw[header_index].reshape(-1).view(IMAGE_HEADER_DTYPE)
+    in_points = _segment_mask(
+        raw.size,
+        points_starts,
+        POINT2D_DTYPE.itemsize * np.asarray(points_lengths, dtype=np.int64),
+    )
+    points2D = raw[in_points].view(POINT2D_DTYPE)
+    return {
+        "ids": headers["id"].astype(np.int64),
+        "qvecs": np.ascontiguousarray(headers["qvec"]),
+        "tvecs": np.ascontiguousarray(headers["tvec"]),
+        "camera_ids": headers["camera_id"].astype(np.int64),
+        "names": names,
+        "points2D_offsets": _offsets_from_lengths(points_lengths),
+        "xys": np.ascontiguousarray(points2D["xy"]),
+        "point3D_ids": points2D["point3D_id"].astype(np.int64),
+    }
+
+
 def read_images_binary(path_to_model_file):
     """
     see: src/colmap/scene/reconstruction.cc
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
+    arrays = read_images_binary_arrays(path_to_model_file)
+    offsets = arrays["points2D_offsets"]
     images = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_reg_images):
-            binary_image_properties = read_next_bytes(
-                fid, num_bytes=64, format_char_sequence="idddddddi"
-            )
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = ""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char.decode("utf-8")
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            num_points2D = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            x_y_id_s = read_next_bytes(
-                fid,
-                num_bytes=24 * num_points2D,
-                format_char_sequence="ddq" * num_points2D,
-            )
-            xys = np.column_stack(
-                [
-                    tuple(map(float, x_y_id_s[0::3])),
-                    tuple(map(float, x_y_id_s[1::3])),
-                ]
-            )
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
-            )
+    for idx, image_id in enumerate(arrays["ids"].tolist()):
+        start, end = offsets[idx], offsets[idx + 1]
+        images[image_id] = Image(
+            id=image_id,
+            qvec=arrays["qvecs"][idx],
+            tvec=arrays["tvecs"][idx],
+            camera_id=int(arrays["camera_ids"][idx]),
+            name=arrays["names"][idx],
+            xys=arrays["xys"][start:end],
+            point3D_ids=arrays["point3D_ids"][start:end],
+        )
     return images
 
 
@@ -360,29 +604,22 @@ def read_points3D_text(path):
         void Reconstruction::ReadPoints3DText(const std::string& path)
         void Reconstruction::WritePoints3DText(const std::string& path)
     """
+    arrays = read_points3D_text_arrays(path)
+    offsets = arrays["track_offsets"]
+    rgbs = arrays["rgb"].astype(np.int64)
+    image_ids = arrays["image_ids"].astype(np.int64)
+    point2D_idxs = arrays["point2D_idxs"].astype(np.int64)
     points3D = {}
-    with open(path, "r") as fid:
-        while True:
-            line = fid.readline()
-            if not line:
-                break
-            line = line.strip()
-            if len(line) > 0 and line[0] != "#":
-                elems = line.split()
-                point3D_id = int(elems[0])
-                xyz = np.array(tuple(map(float, elems[1:4])))
-                rgb = np.array(tuple(map(int, elems[4:7])))
-                error = float(elems[7])
-                image_ids = np.array(tuple(map(int, elems[8::2])))
-                point2D_idxs = np.array(tuple(map(int, elems[9::2])))
-                points3D[point3D_id] = Point3D(
-                    id=point3D_id,
-                    xyz=xyz,
-                    rgb=rgb,
-                    error=error,
-                    image_ids=image_ids,
-                    point2D_idxs=point2D_idxs,
-                )
+    for idx, point3D_id in enumerate(arrays["ids"].tolist()):
+        start, end = offsets[idx], offsets[idx + 1]
+        points3D[point3D_id] = Point3D(
+            id=point3D_id,
+            xyz=arrays["xyz"][idx],
+            rgb=rgbs[idx],
+            error=float(arrays["error"][idx]),
+            image_ids=image_ids[start:end],
+            point2D_idxs=point2D_idxs[start:end],
+        )
     return points3D
 
 
@@ -392,35 +629,22 @@ def read_points3D_binary(path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
+    arrays = read_points3D_binary_arrays(path_to_model_file)
+    offsets = arrays["track_offsets"]
+    rgbs = arrays["rgb"].astype(np.int64)
+    image_ids = arrays["image_ids"].astype(np.int64)
+    point2D_idxs = arrays["point2D_idxs"].astype(np.int64)
     points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for _ in range(num_points):
-            binary_point_line_properties = read_next_bytes(
-                fid, num_bytes=43, format_char_sequence="QdddBBBd"
-            )
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            track_elems = read_next_bytes(
-                fid,
-                num_bytes=8 * track_length,
-                format_char_sequence="ii" * track_length,
-            )
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id,
-                xyz=xyz,
-                rgb=rgb,
-                error=error,
-                image_ids=image_ids,
-                point2D_idxs=point2D_idxs,
-            )
+    for idx, point3D_id in enumerate(arrays["ids"].tolist()):
+        start, end = offsets[idx], offsets[idx + 1]
+        points3D[point3D_id] = Point3D(
+            id=point3D_id,
+            xyz=arrays["xyz"][idx],
+            rgb=rgbs[idx],
+            error=arrays["error"][idx],
+            image_ids=image_ids[start:end],
+            point2D_idxs=point2D_idxs[start:end],
+        )
     return points3D
 
 
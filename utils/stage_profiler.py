@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import torch
+from contextlib import nullcontext
+
+_DISABLED_SCOPE = nullcontext()
+
+class _Scope:
+    __slots__ = ("profiler", "name", "wall_start", "start_event", "memory_start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.memory_start = torch.cuda.memory_allocated() if self.profiler.use_cuda else 0
+        self.start_event = None
+        if self.profiler.use_cuda:
+            self.start_event = torch.cuda.Event(enable_timing=True)
+            self.start_event.record()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall_end = time.perf_counter()
+        end_event = None
+        memory_delta = 0
+        if self.profiler.use_cuda:
+            end_event = torch.cuda.Event(enable_timing=True)
+            end_event.record()
+            memory_delta = torch.cuda.memory_allocated() - self.memory_start
+        self.profiler._add(self.name, self.wall_start, wall_end, self.start_event, end_event, memory_delta)
+        return False
+
+class StageProfiler:
+    """
+    Named timing scopes around the stages of the training loop.
+
+    `with profiler.scope("densify"):` records the wall-clock time, the device time
+    (CUDA events around the scope, read later so the loop is not synchronized), the
+    change in allocated device memory and the call count. Pending scopes are
+    resolved in batches of resolve_every; the first max_trace_events scopes are also
+    kept for a Chrome trace (chrome://tracing, Perfetto) with a host and a device
+    track. A disabled profiler hands out one shared no-op context.
+    """
+
+    def __init__(self, enabled=False, max_trace_events=100_000, resolve_every=4096):
+        self.enabled = enabled
+        self.use_cuda = enabled and torch.cuda.is_available()
+        self.max_trace_events = max_trace_events
+        self.resolve_every = resolve_every
+        self.pending = []
+        self.trace = []
+        self.stats = {}
+        self.wall_origin = time.perf_counter()
+        self.device_origin = None
+        if self.use_cuda:
+            self.device_origin = torch.cuda.Event(enable_timing=True)
+            self.device_origin.record()
+
+    def scope(self, name):
+        if not self.enabled:
+            return _DISABLED_SCOPE
+        return _Scope(self, name)
+
+    def _add(self, name, wall_start, wall_end, start_event, end_event, memory_delta):
+        self.pending.append((name, wall_start, wall_end, start_event, end_event, memory_delta))
+        if len(self.pending) >= self.resolve_every:
+            self._resolve()
+
+    def _resolve(self):
+        if not self.pending:
+            return
+        if self.use_cuda:
+            self.pending[-1][4].synchronize()
+        for name, wall_start, wall_end, start_event, end_event, memory_delta in self.pending:
+            wall_ms = (wall_end - wall_start) * 1000.0
+            device_ms = start_event.elapsed_time(end_event) if start_event is not None else 0.0
+            stat = self.stats.setdefault(name, {"calls": 0, "wall_ms": 0.0, "device_ms": 0.0, "max_wall_ms": 0.0, "memory_delta": 0})
+            stat["calls"] += 1
+            stat["wall_ms"] += wall_ms
+            stat["device_ms"] += device_ms
+            stat["max_wall_ms"] = max(stat["max_wall_ms"], wall_ms)
+            stat["memory_delta"] += memory_delta
+            if len(self.trace) < self.max_trace_events:
+                device_start_ms = self.device_origin.elapsed_time(start_event) if start_event is not None else None
+                self.trace.append((name, (wall_start - self.wall_origin) * 1000.0, wall_ms, device_start_ms, device_ms, memory_delta))
+        self.pending = []
+
+    def summary(self):
+        """ Per-stage table sorted by total wall-clock time. """
+        self._resolve()
+        lines = ["{:<24}{:>8}{:>12}{:>12}{:>12}{:>12}{:>14}".format("stage", "calls", "wall [ms]", "mean [ms]", "max [ms]", "device [ms]", "mem delta [MB]")]
+        for name, stat in sorted(self.stats.items(), key=lambda item: -item[1]["wall_ms"]):
+            lines.append("{:<24}{:>8}{:>12.1f}{:>12.3f}{:>12.3f}{:>12.1f}{:>14.1f}".format(
+                name, stat["calls"], stat["wall_ms"], stat["wall_ms"] / stat["calls"], stat["max_wall_ms"], stat["device_ms"],
+                stat["memory_delta"] / 2**20))
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        self._resolve()
+        events = [{"name": "process_name", "ph": "M", "pid": 0, "args": {"name": "training"}},
+                  {"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "host"}},
+                  {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "device"}}]
+        for name, wall_start_ms, wall_ms, device_start_ms, device_ms, memory_delta in self.trace:
+            events.append({"name": name, "ph": "X", "pid": 0, "tid": 0, "ts": wall_start_ms * 1000.0, "dur": wall_ms * 1000.0,
+                           "args": {"memory_delta_bytes": memory_delta}})
+            if device_start_ms is not None:
+                events.append({"name": name, "ph": "X", "pid": 0, "tid": 1, "ts": device_start_ms * 1000.0, "dur": device_ms * 1000.0})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def write_report(self, model_path):
+        """ Writes stage_profile.txt and stage_trace.json to model_path and prints the table. """
+        table = self.summary()
+        print("\nTraining stage profile\n" + table)
+        with open(os.path.join(model_path, "stage_profile.txt"), "w") as f:
+            f.write(table + "\n")
+        self.export_chrome_trace(os.path.join(model_path, "stage_trace.json"))